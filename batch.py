@@ -0,0 +1,183 @@
+"""
+Batch generation and solving of many mazes across worker processes.
+
+solve_batch fans BatchJobs out over a ProcessPoolExecutor. Every worker
+builds its own maze, generating it or taking the walls it was given, and runs
+each solver headless. Wall grids travel through multiprocessing.shared_memory
+blocks instead of being pickled, and a BatchResult is yielded as soon as its
+job completes. Jobs share nothing but their block, so a batch scales with the
+number of workers.
+
+    jobs = [BatchJob(500, 500, seed) for seed in range(100)]
+    for result in solve_batch(jobs, workers=8):
+        print(result.index, result.solves)
+"""
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field, replace
+from multiprocessing import shared_memory
+from time import perf_counter
+
+from maze import GenerateMethod, Maze, SolveMethod
+from stats import peak_memory
+
+# jobs submitted ahead per worker, which bounds the shared memory in use
+PENDING_PER_WORKER = 2
+
+
+@dataclass
+class BatchJob:
+    """
+    One maze to build and solve with every method in solve_methods. With
+    walls set, those wall masks are solved instead of generating a maze.
+    """
+    num_rows: int
+    num_cols: int
+    seed: int | None = None
+    generate_method: GenerateMethod = GenerateMethod.BACKTRACKER
+    solve_methods: tuple = (SolveMethod.BFS,)
+    walls: bytes | None = None
+
+
+@dataclass
+class BatchResult:
+    """
+    Outcome of the job at position index of the batch. solves has a dict per
+    solve method with its solver name, solve_time, nodes_expanded,
+    peak_frontier, path_length and, when traced, peak_memory. walls is only
+    filled in when the batch keeps them.
+    """
+    index: int
+    num_rows: int
+    num_cols: int
+    seed: int | None
+    generator: str | None
+    generate_time: float
+    solves: list = field(default_factory=list)
+    walls: bytes | None = None
+
+
+def solve_batch(jobs, workers=None, keep_walls=False, trace_memory=False):
+    """
+    Runs the jobs on workers processes, all cores by default, yielding a
+    BatchResult for each job in the order they complete. keep_walls returns
+    the walls of every maze and trace_memory measures the peak memory of each
+    solve in a second pass.
+    """
+    jobs = list(jobs)
+    workers = workers or os.cpu_count() or 1
+    blocks = {}
+    pending = set()
+    try:
+        with ProcessPoolExecutor(workers) as executor:
+            try:
+                next_job = 0
+                while next_job < len(jobs) or pending:
+                    while (
+                        next_job < len(jobs)
+                        and len(pending) < workers * PENDING_PER_WORKER
+                    ):
+                        job = jobs[next_job]
+                        name = None
+                        if job.walls is not None or keep_walls:
+                            blocks[next_job] = _share(job)
+                            name = blocks[next_job].name
+                        pending.add(
+                            executor.submit(
+                                _run_job,
+                                next_job,
+                                replace(job, walls=None),
+                                name,
+                                job.walls is not None,
+                                trace_memory,
+                            )
+                        )
+                        next_job += 1
+
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        result = future.result()
+                        block = blocks.pop(result.index, None)
+                        if block is not None:
+                            if keep_walls:
+                                size = result.num_rows * result.num_cols
+                                result.walls = bytes(block.buf[:size])
+                            _release(block)
+                        yield result
+            finally:
+                # stopped early, so drop the jobs that have not started
+                for future in pending:
+                    future.cancel()
+    finally:
+        for block in blocks.values():
+            _release(block)
+
+
+def _share(job):
+    """
+    A shared memory block the size of the job's grid, holding its walls if
+    it has any.
+    """
+    size = job.num_rows * job.num_cols
+    block = shared_memory.SharedMemory(create=True, size=max(1, size))
+    if job.walls is not None:
+        block.buf[:size] = job.walls
+    return block
+
+
+def _release(block):
+    block.close()
+    block.unlink()
+
+
+def _run_job(index, job, block_name, has_walls, trace_memory):
+    """
+    Builds and solves one maze in a worker process. The walls are read from
+    or written to the shared block when there is one.
+    """
+    block = None if block_name is None else shared_memory.SharedMemory(block_name)
+    try:
+        maze = Maze(0, 0, job.num_rows, job.num_cols, 1, 1, None, job.seed)
+        size = len(maze._grid)
+        if has_walls:
+            maze._grid.walls[:] = block.buf[:size]
+            maze.invalidate_adjacency()
+            generator = None
+            generate_time = 0.0
+        else:
+            start = perf_counter()
+            maze.generate(job.generate_method.value)
+            generate_time = perf_counter() - start
+            generator = job.generate_method.name
+            if block is not None:
+                block.buf[:size] = maze._grid.walls
+
+        solves = []
+        for method in job.solve_methods:
+            result = maze.solve(method.value, headless=True)
+            solve = {
+                "solver": method.name,
+                "solve_time": result.elapsed,
+                "nodes_expanded": result.nodes_expanded,
+                "peak_frontier": result.peak_frontier,
+                "path_length": len(result.path),
+            }
+            if trace_memory:
+                # the whole solve, like the serial benchmark measures it
+                solve["peak_memory"] = peak_memory(
+                    maze.solve, method.value, headless=True
+                )
+            solves.append(solve)
+    finally:
+        if block is not None:
+            block.close()
+
+    return BatchResult(
+        index,
+        job.num_rows,
+        job.num_cols,
+        job.seed,
+        generator,
+        generate_time,
+        solves,
+    )
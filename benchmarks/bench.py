@@ -0,0 +1,304 @@
+"""
+Benchmarks headless maze generation and solving across sizes, generators,
+solvers and seeds.
+
+    python -m benchmarks.bench --sizes 10x10,100x100 --output results.json
+    python -m benchmarks.bench --baseline results.json
+    python -m benchmarks.bench --sizes 500x500 --seeds 1,2,3,4 --workers 4
+
+Every case records the wall time of generation and of the solve, measured
+with perf_counter, the peak memory of the solve from tracemalloc in a
+separate pass, the number of expanded cells and the path length. Results
+are written as JSON and optionally CSV, and can be checked against a saved
+baseline, in which case the exit status is 1 if anything got slower. With
+workers the mazes are spread over that many processes with batch.solve_batch.
+"""
+import argparse
+import csv
+import json
+import sys
+from time import perf_counter
+
+from maze import GenerateMethod, Maze, SolveMethod
+from stats import peak_memory
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SIZES = [(10, 10), (100, 100), (500, 500), (1000, 1000), (2000, 2000)]
+SEEDS = [1, 2, 3]
+
+# a case is slower when its time grows by more than this fraction
+THRESHOLD = 0.25
+# times below this many seconds are too noisy to compare
+MIN_TIME = 0.005
+
+# methods left out of the default matrix when NumPy is not installed
+NUMPY_GENERATORS = [GenerateMethod.BINARY_TREE, GenerateMethod.SIDEWINDER]
+NUMPY_SOLVERS = [SolveMethod.DEADEND_FILL]
+
+FIELDS = [
+    "rows",
+    "cols",
+    "generator",
+    "solver",
+    "seed",
+    "generate_time",
+    "solve_time",
+    "peak_memory",
+    "nodes_expanded",
+    "peak_frontier",
+    "path_length",
+]
+
+
+def run_benchmarks(
+    sizes=SIZES,
+    generators=None,
+    solvers=None,
+    seeds=SEEDS,
+    memory=True,
+    workers=None,
+):
+    """
+    Runs every combination and returns one result dict per case. Each maze is
+    generated once per size, generator and seed and then solved by every
+    solver. With workers the mazes are run in parallel processes, and the
+    results come back in the same order. By default every generator and
+    solver that can run here is used.
+    """
+    has_numpy = numpy is not None
+    if generators is None:
+        generators = default_methods(GenerateMethod, NUMPY_GENERATORS, has_numpy)
+    if solvers is None:
+        solvers = default_methods(SolveMethod, NUMPY_SOLVERS, has_numpy)
+    if workers is not None:
+        return _run_parallel(sizes, generators, solvers, seeds, memory, workers)
+    results = []
+
+    for rows, cols in sizes:
+        for generator in generators:
+            for seed in seeds:
+                maze = Maze(0, 0, rows, cols, 1, 1, None, seed)
+                start = perf_counter()
+                maze.generate(generator.value)
+                generate_time = perf_counter() - start
+
+                for solver in solvers:
+                    result = maze.solve(solver.value, headless=True)
+                    peak = _solve_peak_memory(maze, solver) if memory else None
+                    results.append(
+                        {
+                            "rows": rows,
+                            "cols": cols,
+                            "generator": generator.name,
+                            "solver": solver.name,
+                            "seed": seed,
+                            "generate_time": generate_time,
+                            "solve_time": result.elapsed,
+                            "peak_memory": peak,
+                            "nodes_expanded": result.nodes_expanded,
+                            "peak_frontier": result.peak_frontier,
+                            "path_length": len(result.path),
+                        }
+                    )
+    return results
+
+
+def default_methods(enum, needs_numpy, has_numpy):
+    """
+    Every member of enum, without the ones in needs_numpy unless has_numpy.
+    """
+    return [method for method in enum if has_numpy or method not in needs_numpy]
+
+
+def _run_parallel(sizes, generators, solvers, seeds, memory, workers):
+    from batch import BatchJob, solve_batch
+
+    jobs = [
+        BatchJob(rows, cols, seed, generator, tuple(solvers))
+        for rows, cols in sizes
+        for generator in generators
+        for seed in seeds
+    ]
+    cases = [None] * len(jobs)
+    for result in solve_batch(jobs, workers, trace_memory=memory):
+        cases[result.index] = [
+            {
+                "rows": result.num_rows,
+                "cols": result.num_cols,
+                "generator": result.generator,
+                "seed": result.seed,
+                "generate_time": result.generate_time,
+                "peak_memory": None,
+                **solve,
+            }
+            for solve in result.solves
+        ]
+    return [
+        {field: case[field] for field in FIELDS} for job in cases for case in job
+    ]
+
+
+def _solve_peak_memory(maze, solver):
+    """
+    Peak bytes allocated while solving, in its own pass since tracing slows
+    the solve down. Workers of batch.solve_batch measure it the same way.
+    """
+    return peak_memory(maze.solve, solver.value, headless=True)
+
+
+def _key(result):
+    return (
+        result["rows"],
+        result["cols"],
+        result["generator"],
+        result["solver"],
+        result["seed"],
+    )
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Returns a description of every case that got slower than the baseline, or
+    expands more cells than it did.
+    """
+    previous = {_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(_key(result))
+        if before is None:
+            continue
+        name = "{}x{} {} {} seed {}".format(*_key(result))
+        for field in ("generate_time", "solve_time"):
+            if before[field] < MIN_TIME and result[field] < MIN_TIME:
+                continue
+            if result[field] > before[field] * (1 + threshold):
+                regressions.append(
+                    f"{name}: {field} {before[field]:.4f}s -> {result[field]:.4f}s"
+                )
+        if result["nodes_expanded"] > before["nodes_expanded"]:
+            regressions.append(
+                f"{name}: nodes_expanded {before['nodes_expanded']}"
+                f" -> {result['nodes_expanded']}"
+            )
+    return regressions
+
+
+def write_json(results, path):
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2)
+
+
+def read_json(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def write_csv(results, path):
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def _parse_sizes(value):
+    sizes = []
+    for size in value.split(","):
+        rows, cols = size.lower().split("x")
+        sizes.append((int(rows), int(cols)))
+    return sizes
+
+
+def _parse_names(enum):
+    def parse(value):
+        return [enum[name.strip().upper()] for name in value.split(",")]
+
+    return parse
+
+
+def _parse_seeds(value):
+    return [int(seed) for seed in value.split(",")]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.bench",
+        description="Benchmark headless maze generation and solving.",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=_parse_sizes,
+        default=SIZES,
+        help="comma separated ROWSxCOLS sizes",
+    )
+    parser.add_argument(
+        "--generators",
+        type=_parse_names(GenerateMethod),
+        help="comma separated GenerateMethod names, all that can run by default",
+    )
+    parser.add_argument(
+        "--solvers",
+        type=_parse_names(SolveMethod),
+        help="comma separated SolveMethod names, all that can run by default",
+    )
+    parser.add_argument(
+        "--seeds", type=_parse_seeds, default=SEEDS, help="comma separated seeds"
+    )
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--csv", help="write results as CSV to this path")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=THRESHOLD,
+        help="allowed fractional slowdown before a case is a regression",
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="skip the tracemalloc pass",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="run the mazes in this many processes instead of one at a time",
+    )
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    results = run_benchmarks(
+        args.sizes,
+        args.generators,
+        args.solvers,
+        args.seeds,
+        not args.no_memory,
+        args.workers,
+    )
+
+    for result in results:
+        print(
+            "{rows}x{cols} {generator} {solver} seed {seed}: "
+            "generate {generate_time:.4f}s solve {solve_time:.4f}s "
+            "expanded {nodes_expanded} path {path_length}".format(**result)
+        )
+    if args.output:
+        write_json(results, args.output)
+    if args.csv:
+        write_csv(results, args.csv)
+
+    if args.baseline:
+        regressions = compare(results, read_json(args.baseline), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
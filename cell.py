@@ -1,67 +1,134 @@
-from point import Line, Point
+from grid import Grid, TOP, BOTTOM, LEFT, RIGHT, OPPOSITE
+
+
+def _wall_property(wall):
+    def getter(self):
+        return bool(self._grid.walls[self._index] & wall)
+
+    def setter(self, present):
+        self._grid.set_wall(self._index, wall, present)
+
+    return property(getter, setter)
+
 
 class Cell:
     """
     Object to define and draw a cell with their movements
+
+    A cell is a thin view over one index of a Grid. Without a grid it gets a
+    single cell grid of its own so it can still be used on its own.
     """
     def __init__(
         self,
-        win=None,
+        canvas=None,
+        grid=None,
+        index=0,
     ):
-        self._visited = False
-        self._win = win
+        self._grid = grid if grid is not None else Grid(1, 1)
+        self._index = index
+        self._canvas = canvas
         self._x1 = None
         self._y1 = None
         self._x2 = None
         self._y2 = None
-        self.has_bottom_wall = True
-        self.has_top_wall = True
-        self.has_left_wall = True
-        self.has_right_wall = True
+
+    has_top_wall = _wall_property(TOP)
+    has_bottom_wall = _wall_property(BOTTOM)
+    has_left_wall = _wall_property(LEFT)
+    has_right_wall = _wall_property(RIGHT)
+
+    @property
+    def _visited(self):
+        return bool(self._grid.visited[self._index])
+
+    @_visited.setter
+    def _visited(self, value):
+        self._grid.visited[self._index] = 1 if value else 0
 
     def draw(self, x1, y1, x2, y2):
         self._x1 = x1
         self._y1 = y1
         self._x2 = x2
         self._y2 = y2
-        white_top_line = Line(Point(x1, y1), Point(x2, y1))
-        white_bottom_line = Line(Point(x1, y2), Point(x2, y2))
-        white_left_line = Line(Point(x1, y1), Point(x1, y2))
-        white_right_line = Line(Point(x2, y1), Point(x2, y2))
-        self._win.canvas.draw_line(white_top_line, "white")
-        self._win.canvas.draw_line(white_bottom_line, "white")
-        self._win.canvas.draw_line(white_left_line, "white")
-        self._win.canvas.draw_line(white_right_line, "white")
-
-        if self.has_top_wall:
-            line = Line(Point(x1, y1), Point(x2, y1))
-            self._win.canvas.draw_line(line)
-
-        if self.has_bottom_wall:
-            line = Line(Point(x1, y2), Point(x2, y2))
-            self._win.canvas.draw_line(line)
-
-        if self.has_left_wall:
-            line = Line(Point(x1, y1), Point(x1, y2))
-            self._win.canvas.draw_line(line)
-
-        if self.has_right_wall:
-            line = Line(Point(x2, y1), Point(x2, y2))
-            self._win.canvas.draw_line(line)
+        canvas = self._canvas
+        canvas.draw_wall(self._wall_key(TOP), (x1, y1, x2, y1), self.has_top_wall)
+        canvas.draw_wall(
+            self._wall_key(BOTTOM), (x1, y2, x2, y2), self.has_bottom_wall
+        )
+        canvas.draw_wall(self._wall_key(LEFT), (x1, y1, x1, y2), self.has_left_wall)
+        canvas.draw_wall(
+            self._wall_key(RIGHT), (x2, y1, x2, y2), self.has_right_wall
+        )
+
+    def _wall_key(self, wall):
+        """
+        Walls shared by two cells get the same key from both sides, named by
+        the cell above or to the left of the wall.
+        """
+        if wall == TOP or wall == LEFT:
+            neighbour = self._grid.neighbour(self._index, wall)
+            if neighbour != -1:
+                return (neighbour, OPPOSITE[wall])
+        return (self._index, wall)
+
+    def center(self):
+        return ((self._x1 + self._x2) // 2, (self._y1 + self._y2) // 2)
 
     def draw_move(self, to_cell, undo=False):
         fill_color = "green"
         if undo:
             fill_color = "red"
 
-        mid = ((self._x1 + self._x2) // 2, (self._y1 + self._y2) // 2)
-        mid_to_cell = (
-            (to_cell._x1 + to_cell._x2) // 2,
-            (to_cell._y1 + to_cell._y2) // 2,
-        )
+        key = (min(self._index, to_cell._index), max(self._index, to_cell._index))
+        self._canvas.draw_move(key, self.center() + to_cell.center(), fill_color)
+
+    def __eq__(self, other):
+        if not isinstance(other, Cell):
+            return NotImplemented
+        return self._grid is other._grid and self._index == other._index
 
-        line = Line(Point(mid[0], mid[1]), Point(mid_to_cell[0], mid_to_cell[1]))
-        self._win.canvas.draw_line(line, fill_color)
+    def __hash__(self):
+        return hash((id(self._grid), self._index))
 
     def __repr__(self):
         return f"Cell"
+
+
+class CellRows:
+    """
+    Read only list-of-lists view of a Grid, so maze._cells[i][j] hands back a
+    Cell for that position.
+    """
+    def __init__(self, grid, canvas=None, bounds=None):
+        self._grid = grid
+        self._canvas = canvas
+        self._bounds = bounds
+
+    def __len__(self):
+        return self._grid.num_rows
+
+    def __getitem__(self, i):
+        if not -self._grid.num_rows <= i < self._grid.num_rows:
+            raise IndexError("maze row index out of range")
+        return _CellRow(self, i % self._grid.num_rows)
+
+    def cell(self, i, j):
+        cell = Cell(self._canvas, self._grid, self._grid.index(i, j))
+        if self._bounds is not None:
+            cell._x1, cell._y1, cell._x2, cell._y2 = self._bounds(i, j)
+        return cell
+
+
+class _CellRow:
+    def __init__(self, rows, i):
+        self._rows = rows
+        self._i = i
+
+    def __len__(self):
+        return self._rows._grid.num_cols
+
+    def __getitem__(self, j):
+        num_cols = self._rows._grid.num_cols
+        if not -num_cols <= j < num_cols:
+            raise IndexError("maze column index out of range")
+        return self._rows.cell(self._i, j % num_cols)
@@ -0,0 +1,385 @@
+import random
+from array import array
+
+from grid import ALL_WALLS, TOP, RIGHT, BOTTOM, LEFT, OPPOSITE
+
+# steps between calls to a check_cancelled hook, in carvers and solvers
+CANCEL_CHECK = 4096
+
+
+def carve_backtracker(
+    grid, start=0, rng=random, on_carve=None, check_cancelled=None
+):
+    """
+    Randomized depth first backtracker on an explicit stack of cell indices.
+
+    The stack is preallocated with one slot per cell and every cell is pushed
+    at most once, so any size of maze can be carved without recursion.
+    Neighbours are tried in grid.NEIGHBOUR_ORDER: j + 1, j - 1, i - 1, i + 1.
+    on_carve(index, next_index) is called after every passage is opened, and
+    check_cancelled() every CANCEL_CHECK passages so a caller can stop the
+    carve by raising from it. Returns the number of passages opened.
+    """
+    num_rows, num_cols = grid.num_rows, grid.num_cols
+    walls, visited = grid.walls, grid.visited
+    offsets = {BOTTOM: 1, TOP: -1, LEFT: -num_cols, RIGHT: num_cols}
+
+    stack = grid.allocate("i")
+    stack[0] = start
+    top = 0
+    visited[start] = 1
+    carved = 0
+
+    while top >= 0:
+        index = stack[top]
+        i, j = divmod(index, num_cols)
+        options = []
+        if j + 1 < num_cols and not visited[index + 1]:
+            options.append(BOTTOM)
+        if j > 0 and not visited[index - 1]:
+            options.append(TOP)
+        if i > 0 and not visited[index - num_cols]:
+            options.append(LEFT)
+        if i + 1 < num_rows and not visited[index + num_cols]:
+            options.append(RIGHT)
+
+        # dead end, backtrack
+        if not options:
+            top -= 1
+            continue
+
+        wall = rng.choice(options)
+        next_index = index + offsets[wall]
+        walls[index] &= ~wall
+        walls[next_index] &= ~OPPOSITE[wall]
+        visited[next_index] = 1
+        top += 1
+        stack[top] = next_index
+        carved += 1
+        if on_carve is not None:
+            on_carve(index, next_index)
+        if check_cancelled is not None and not carved % CANCEL_CHECK:
+            check_cancelled()
+
+    return carved
+
+
+class UnionFind:
+    """
+    Disjoint sets over cell indices stored in flat arrays, with path halving
+    and union by rank.
+    """
+    def __init__(self, size):
+        self.parent = array("i", range(size))
+        self.rank = bytearray(size)
+
+    def find(self, index):
+        parent = self.parent
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    def union(self, a, b):
+        """
+        Joins the sets of a and b, returns False if they were already joined.
+        """
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return False
+        if self.rank[a] < self.rank[b]:
+            a, b = b, a
+        self.parent[b] = a
+        if self.rank[a] == self.rank[b]:
+            self.rank[a] += 1
+        return True
+
+
+def carve_kruskal(grid, rng=random, on_carve=None, check_cancelled=None):
+    """
+    Randomized Kruskal's algorithm: every inner wall is visited in random
+    order and opened when the cells on both sides are not connected yet.
+    The hooks work as in carve_backtracker. Returns the number of passages
+    opened.
+    """
+    num_rows, num_cols = grid.num_rows, grid.num_cols
+    walls = grid.walls
+
+    # wall ids are index * 2 for the BOTTOM wall and index * 2 + 1 for RIGHT
+    edges = array("i")
+    for index in range(len(grid)):
+        i, j = divmod(index, num_cols)
+        if j + 1 < num_cols:
+            edges.append(index * 2)
+        if i + 1 < num_rows:
+            edges.append(index * 2 + 1)
+    rng.shuffle(edges)
+
+    sets = UnionFind(len(grid))
+    remaining = len(grid) - 1
+    for edge in edges:
+        if not remaining:
+            break
+        index = edge >> 1
+        if edge & 1:
+            wall, next_index = RIGHT, index + num_cols
+        else:
+            wall, next_index = BOTTOM, index + 1
+        if sets.union(index, next_index):
+            walls[index] &= ~wall
+            walls[next_index] &= ~OPPOSITE[wall]
+            remaining -= 1
+            if on_carve is not None:
+                on_carve(index, next_index)
+            if check_cancelled is not None and not remaining % CANCEL_CHECK:
+                check_cancelled()
+    return len(grid) - 1 - remaining
+
+
+def carve_wilson(grid, rng=random, on_carve=None, check_cancelled=None):
+    """
+    Wilson's algorithm: loop erased random walks from every cell outside the
+    tree until they hit it, which gives a uniformly random spanning tree.
+
+    The walk only keeps the last direction taken out of each cell, so loops
+    are erased by overwriting and memory is one byte per cell. The first
+    walks can take many steps without carving anything, so check_cancelled
+    is called every CANCEL_CHECK steps of the walk. Returns the number of
+    passages opened.
+    """
+    num_rows, num_cols = grid.num_rows, grid.num_cols
+    walls = grid.walls
+    offsets = {BOTTOM: 1, TOP: -1, LEFT: -num_cols, RIGHT: num_cols}
+    in_tree = grid.allocate("B")
+    direction = grid.allocate("B")
+    in_tree[rng.randrange(len(grid))] = 1
+    carved = 0
+    steps = 0
+
+    for start in range(len(grid)):
+        if in_tree[start]:
+            continue
+
+        # random walk until the tree is reached
+        index = start
+        while not in_tree[index]:
+            i, j = divmod(index, num_cols)
+            options = []
+            if j + 1 < num_cols:
+                options.append(BOTTOM)
+            if j > 0:
+                options.append(TOP)
+            if i > 0:
+                options.append(LEFT)
+            if i + 1 < num_rows:
+                options.append(RIGHT)
+            wall = rng.choice(options)
+            direction[index] = wall
+            index += offsets[wall]
+            steps += 1
+            if check_cancelled is not None and not steps % CANCEL_CHECK:
+                check_cancelled()
+
+        # carve the loop erased path into the tree
+        index = start
+        while not in_tree[index]:
+            wall = direction[index]
+            next_index = index + offsets[wall]
+            walls[index] &= ~wall
+            walls[next_index] &= ~OPPOSITE[wall]
+            in_tree[index] = 1
+            carved += 1
+            if on_carve is not None:
+                on_carve(index, next_index)
+            index = next_index
+
+    return carved
+
+
+def carve_binary_tree(grid, seed=None):
+    """
+    Binary tree maze carved with a few NumPy operations over the whole grid.
+
+    Every cell opens either its TOP or its LEFT wall at random, cells on the
+    first row or column open the only one of the two that leads inside.
+    Returns the number of passages opened. Needs NumPy.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    walls = grid.wall_array()
+    walls[...] = ALL_WALLS
+
+    carve_top = rng.integers(0, 2, size=walls.shape, dtype=np.uint8).astype(bool)
+    carve_left = ~carve_top
+    carve_top[1:, 0] = False
+    carve_left[1:, 0] = True
+    carve_top[0, 1:] = True
+    carve_left[0, :] = False
+    carve_top[0, 0] = False
+
+    _open(walls, carve_top, TOP)
+    _open(walls[:, :-1], carve_top[:, 1:], BOTTOM)
+    _open(walls, carve_left, LEFT)
+    _open(walls[:-1, :], carve_left[1:, :], RIGHT)
+    grid.store_wall_array(walls)
+    return int(np.count_nonzero(carve_top) + np.count_nonzero(carve_left))
+
+
+def carve_sidewinder(grid, seed=None):
+    """
+    Sidewinder maze carved with NumPy over the whole grid at once.
+
+    Each row is split into random runs of cells joined through BOTTOM/TOP,
+    and every run opens one random member's LEFT wall into the row before.
+    The first row is a single run. Returns the number of passages opened.
+    Needs NumPy.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    walls = grid.wall_array()
+    walls[...] = ALL_WALLS
+    num_rows, num_cols = walls.shape
+
+    close = rng.integers(0, 2, size=walls.shape, dtype=np.uint8).astype(bool)
+    close[0, :] = False
+    close[:, -1] = True
+
+    # extend the run towards j + 1 unless it is closed here
+    extend = ~close
+    _open(walls, extend, BOTTOM)
+    _open(walls[:, 1:], extend[:, :-1], TOP)
+    carved = int(np.count_nonzero(extend))
+
+    if num_rows > 1:
+        # runs never span rows because the last cell of a row always closes
+        ends = np.flatnonzero(close[1:].ravel())
+        starts = np.empty_like(ends)
+        starts[0] = 0
+        starts[1:] = ends[:-1] + 1
+        chosen = starts + (rng.random(ends.size) * (ends - starts + 1)).astype(ends.dtype)
+        carve_left = np.zeros((num_rows - 1) * num_cols, dtype=bool)
+        carve_left[chosen] = True
+        carve_left = carve_left.reshape(num_rows - 1, num_cols)
+        _open(walls[1:, :], carve_left, LEFT)
+        _open(walls[:-1, :], carve_left, RIGHT)
+        carved += ends.size
+    grid.store_wall_array(walls)
+    return carved
+
+
+def _open(walls, where, wall):
+    """
+    Clears a wall bit in every cell selected by the boolean array where.
+    """
+    import numpy as np
+
+    walls &= ~(where.view(np.uint8) * np.uint8(wall))
+
+
+def eller_rows(num_rows, num_cols, rng=random):
+    """
+    Eller's algorithm, one row at a time.
+
+    Yields a bytearray of num_cols wall masks for every row i as soon as it
+    is finished. Only the set labels of the current row are kept, so memory
+    stays proportional to num_cols however many rows are generated. Within a
+    row, cell j and j + 1 are joined through BOTTOM/TOP and row i joins row
+    i + 1 through RIGHT/LEFT, the same layout as Grid.
+    """
+    # set label of every cell in the current row, always below num_cols
+    labels = list(range(num_cols))
+    carried = bytearray(num_cols)
+
+    for i in range(num_rows):
+        last = i == num_rows - 1
+        row = bytearray([ALL_WALLS]) * num_cols
+        for j in range(num_cols):
+            if carried[j]:
+                row[j] &= ~LEFT
+
+        # randomly join neighbours that are not connected yet,
+        # the last row has to join all of them
+        parent = list(range(num_cols))
+        for j in range(num_cols - 1):
+            a = _find(parent, labels[j])
+            b = _find(parent, labels[j + 1])
+            if a != b and (last or rng.random() < 0.5):
+                parent[b] = a
+                row[j] &= ~BOTTOM
+                row[j + 1] &= ~TOP
+
+        if last:
+            yield row
+            return
+
+        # every set carries on into the next row through at least one cell
+        groups = {}
+        for j in range(num_cols):
+            groups.setdefault(_find(parent, labels[j]), []).append(j)
+
+        carried = bytearray(num_cols)
+        next_labels = [-1] * num_cols
+        label = 0
+        for members in groups.values():
+            down = [j for j in members if rng.random() < 0.5]
+            if not down:
+                down = [rng.choice(members)]
+            for j in down:
+                row[j] &= ~RIGHT
+                carried[j] = 1
+                next_labels[j] = label
+            label += 1
+
+        # cells that did not carry a set start a new one
+        for j in range(num_cols):
+            if next_labels[j] == -1:
+                next_labels[j] = label
+                label += 1
+        labels = next_labels
+
+        yield row
+
+
+# passages a mask opens towards j + 1 and i + 1, so every passage counts once
+PASSAGES = bytes(
+    (not mask & BOTTOM) + (not mask & RIGHT) for mask in range(256)
+)
+
+
+def count_passages(row):
+    """
+    Passages opened by a row of masks from eller_rows.
+    """
+    return sum(row.translate(PASSAGES))
+
+
+def _find(parent, label):
+    while parent[label] != label:
+        parent[label] = parent[parent[label]]
+        label = parent[label]
+    return label
+
+
+def eller_maze_rows(num_rows, num_cols, rng=random):
+    """
+    Rows from eller_rows with the entrance and exit opened, ready to store.
+    """
+    for i, row in enumerate(eller_rows(num_rows, num_cols, rng)):
+        if i == 0:
+            row[0] &= ~TOP
+        if i == num_rows - 1:
+            row[-1] &= ~BOTTOM
+        yield row
+
+
+def write_eller(file, num_rows, num_cols, rng=random):
+    """
+    Streams an Eller's maze with its entrance and exit open into a binary
+    file, one mask byte per cell in row order, without keeping the maze in
+    memory. See mazefile.write_rows for the packed format.
+    """
+    for row in eller_maze_rows(num_rows, num_cols, rng):
+        file.write(row)
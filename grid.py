@@ -0,0 +1,228 @@
+from array import array
+
+# Wall bits stored in each cell's mask. The names follow the Cell attributes,
+# so TOP is has_top_wall, BOTTOM is has_bottom_wall and so on.
+TOP = 1
+RIGHT = 2
+BOTTOM = 4
+LEFT = 8
+ALL_WALLS = TOP | RIGHT | BOTTOM | LEFT
+
+OPPOSITE = {
+    TOP: BOTTOM,
+    BOTTOM: TOP,
+    LEFT: RIGHT,
+    RIGHT: LEFT,
+}
+
+# cells along each side of a tile carved by tiling.carve_tiled, kept here so
+# the default is known without importing the tile carver
+TILE_SIZE = 256
+
+# Order the carvers and solvers try neighbours in: j + 1, j - 1, i - 1, i + 1
+NEIGHBOUR_ORDER = (BOTTOM, TOP, LEFT, RIGHT)
+
+# each mask with its wall bits flipped, so set bits mean no wall
+_OPEN = bytes(~mask & ALL_WALLS for mask in range(256))
+
+
+class Grid:
+    """
+    Compact storage for the maze walls.
+
+    Cell (i, j) lives at index i * num_cols + j. Each index holds one byte
+    with the wall mask of that cell, and a separate byte array, allocated
+    when first used, keeps the visited flags. Moving across a wall is plain index math:
+
+        TOP    -> index - 1         (j - 1)
+        BOTTOM -> index + 1         (j + 1)
+        LEFT   -> index - num_cols  (i - 1)
+        RIGHT  -> index + num_cols  (i + 1)
+    """
+    def __init__(self, num_rows, num_cols, walls=None, visited=None):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        size = num_rows * num_cols
+        self.walls = bytearray([ALL_WALLS]) * size if walls is None else walls
+        # allocated on first use, so a grid over a maze file that is never
+        # solved does not pay for it
+        self._visited = visited
+        # bumped by set_wall and carve so cached adjacency knows to rebuild
+        self.changes = 0
+
+    def __len__(self):
+        return self.num_rows * self.num_cols
+
+    @property
+    def visited(self):
+        if self._visited is None:
+            self._visited = bytearray(len(self))
+        return self._visited
+
+    @visited.setter
+    def visited(self, visited):
+        self._visited = visited
+
+    def index(self, i, j):
+        return i * self.num_cols + j
+
+    def position(self, index):
+        return divmod(index, self.num_cols)
+
+    def offset(self, wall):
+        """
+        Index distance to the neighbour on the other side of the given wall.
+        """
+        if wall == TOP:
+            return -1
+        if wall == BOTTOM:
+            return 1
+        if wall == LEFT:
+            return -self.num_cols
+        return self.num_cols
+
+    def neighbour(self, index, wall):
+        """
+        Returns the index across the given wall, or -1 if it is outside the grid.
+        """
+        i, j = divmod(index, self.num_cols)
+        if wall == TOP:
+            inside = j > 0
+        elif wall == BOTTOM:
+            inside = j < self.num_cols - 1
+        elif wall == LEFT:
+            inside = i > 0
+        else:
+            inside = i < self.num_rows - 1
+        return index + self.offset(wall) if inside else -1
+
+    def has_wall(self, index, wall):
+        return bool(self.walls[index] & wall)
+
+    def set_wall(self, index, wall, present):
+        self.changes += 1
+        if present:
+            self.walls[index] |= wall
+        else:
+            self.walls[index] &= ~wall & ALL_WALLS
+
+    def carve(self, index, wall):
+        """
+        Removes the wall on both sides between a cell and its neighbour.
+        """
+        self.changes += 1
+        self.walls[index] &= ~wall & ALL_WALLS
+        other = self.neighbour(index, wall)
+        if other != -1:
+            self.walls[other] &= ~OPPOSITE[wall] & ALL_WALLS
+
+    def neighbour_offsets(self):
+        """
+        For every open mask, the index offsets of its open neighbours in
+        NEIGHBOUR_ORDER, so moving on is a table lookup and an add.
+        """
+        return [
+            tuple(self.offset(wall) for wall in NEIGHBOUR_ORDER if mask & wall)
+            for mask in range(ALL_WALLS + 1)
+        ]
+
+    def open_masks(self):
+        """
+        Per cell mask of the walls that can be crossed: open on both sides
+        and leading to a cell inside the grid, so the entrance and exit are
+        not included.
+
+        For walls in memory the whole grid is done at once as big integer bit
+        operations, with byte k of the integer holding cell k. Other storage
+        gets a view that works the mask out on every access instead.
+        """
+        if not isinstance(self.walls, (bytes, bytearray)):
+            return _OpenMaskView(self)
+
+        size = len(self)
+        shift = 8 * self.num_cols
+        walls = int.from_bytes(self.walls.translate(_OPEN), "little")
+        ones = int.from_bytes(b"\x01" * size, "little")
+
+        # move each neighbour's opposite bit onto this cell's bit
+        top = walls << 6 & ones * TOP
+        bottom = walls >> 6 & ones * BOTTOM
+        left = walls << shift + 2 & ones * LEFT
+        right = walls >> shift + 2 & ones * RIGHT
+        both_sides = walls & (top | bottom | left | right)
+
+        inside = int.from_bytes(self._inside_masks(), "little")
+        return bytearray((both_sides & inside).to_bytes(size, "little"))
+
+    def _inside_masks(self):
+        """
+        Per cell mask of the walls that have a cell on the other side.
+        """
+        row = bytearray([ALL_WALLS]) * self.num_cols
+        row[0] &= ~TOP
+        row[-1] &= ~BOTTOM
+        masks = row * self.num_rows
+        for index in range(self.num_cols):
+            masks[index] &= ~LEFT
+            masks[len(self) - 1 - index] &= ~RIGHT
+        return masks
+
+    def allocate(self, typecode, fill=0):
+        """
+        A new per cell array of the given array typecode for generators and
+        solvers, so grids stored elsewhere can keep it out of memory too.
+        """
+        return array(typecode, [fill]) * len(self)
+
+    def reset_visited(self):
+        if self._visited is not None:
+            self._visited[:] = bytes(len(self._visited))
+
+    def wall_array(self):
+        """
+        The wall masks as a (num_rows, num_cols) NumPy uint8 array sharing
+        memory with the grid, so writes to it change the maze. Packed walls
+        from a maze file are unpacked into a copy instead.
+        """
+        import numpy as np
+
+        walls = self.walls
+        if hasattr(walls, "unpack"):
+            walls = walls.unpack()
+        return np.frombuffer(walls, dtype=np.uint8).reshape(
+            self.num_rows, self.num_cols
+        )
+
+    def store_wall_array(self, walls):
+        """
+        Writes an array from wall_array back into the grid. In memory walls
+        share memory with it, so only packed walls, which were unpacked into a
+        copy, are written back. Packed walls over a read only file raise
+        TypeError.
+        """
+        if hasattr(self.walls, "unpack"):
+            self.walls[:] = walls.tobytes()
+
+
+class _OpenMaskView:
+    """
+    Open masks of a grid whose walls are not a plain byte array, worked out
+    one cell at a time so nothing has to be loaded in full.
+    """
+    def __init__(self, grid):
+        self._grid = grid
+
+    def __len__(self):
+        return len(self._grid)
+
+    def __getitem__(self, index):
+        grid = self._grid
+        walls = grid.walls
+        own = ~walls[index]
+        mask = 0
+        for wall in NEIGHBOUR_ORDER:
+            if own & wall:
+                other = grid.neighbour(index, wall)
+                if other != -1 and not walls[other] & OPPOSITE[wall]:
+                    mask |= wall
+        return mask
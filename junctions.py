@@ -0,0 +1,173 @@
+"""
+Corridor contraction of a maze into a junction graph.
+
+Most cells of a carved maze have exactly two open sides and only lead from
+one cell to the next. The junction graph keeps the other cells (junctions,
+dead ends) plus the entrance and exit as nodes, and turns every corridor
+between two of them into one edge weighted by its length. Searches then step
+over whole corridors at once, and a path of nodes is expanded back into
+cells by walking the corridors again.
+"""
+from array import array
+from heapq import heappush, heappop
+
+from generators import CANCEL_CHECK
+
+# open sides of every mask
+DEGREE = [bin(mask).count("1") for mask in range(16)]
+
+
+class JunctionGraph:
+    """
+    Junction graph of a grid in compressed sparse row form. Node n is the
+    cell cells[n], its edges are first[n] to first[n + 1] in targets, weights
+    (corridor length in steps) and steps (the offset of the first step from
+    node n into the corridor). node_of gives the node of a cell, or -1.
+
+    check_cancelled() is called every CANCEL_CHECK cells while building, so
+    a caller can stop the build by raising from it.
+    """
+    def __init__(self, grid, open_masks, offsets, check_cancelled=None):
+        self.num_rows = grid.num_rows
+        self.num_cols = grid.num_cols
+        self._open_masks = open_masks
+        self._offsets = offsets
+        goal = len(grid) - 1
+
+        self.node_of = grid.allocate("i", -1)
+        self.cells = array("i")
+        for index in range(len(grid)):
+            if check_cancelled is not None and not index % CANCEL_CHECK:
+                check_cancelled()
+            if DEGREE[open_masks[index]] != 2 or index == 0 or index == goal:
+                self.node_of[index] = len(self.cells)
+                self.cells.append(index)
+
+        self.first = array("i", [0])
+        self.targets = array("i")
+        self.weights = array("i")
+        self.steps = array("i")
+        for node, cell in enumerate(self.cells):
+            if check_cancelled is not None and not node % CANCEL_CHECK:
+                check_cancelled()
+            for offset in offsets[open_masks[cell]]:
+                target, length = self._walk(cell, offset)
+                if target != -1:
+                    self.targets.append(target)
+                    self.weights.append(length)
+                    self.steps.append(offset)
+            self.first.append(len(self.targets))
+
+    def __len__(self):
+        return len(self.cells)
+
+    def _walk(self, cell, offset, path=None):
+        """
+        Follows a corridor from a node cell through its first step, returning
+        the node at the other end and the corridor length. Cells passed,
+        including the end, are appended to path when one is given.
+        """
+        node_of = self.node_of
+        open_masks = self._open_masks
+        offsets = self._offsets
+        previous = cell
+        current = cell + offset
+        length = 1
+        while node_of[current] == -1:
+            if path is not None:
+                path.append(current)
+            first, second = offsets[open_masks[current]]
+            next_cell = current + first
+            if next_cell == previous:
+                next_cell = current + second
+            previous = current
+            current = next_cell
+            length += 1
+        if path is not None:
+            path.append(current)
+        # a corridor that loops back into its own node is no shortcut
+        if current == cell:
+            return -1, length
+        return node_of[current], length
+
+    def search(self, start, goal, check_cancelled=None):
+        """
+        A* over the nodes from cell start to cell goal, both nodes, with the
+        Manhattan distance as heuristic, which never overestimates a corridor.
+        check_cancelled() is called every CANCEL_CHECK expansions.
+
+        Returns the path of cells, the nodes expanded, the peak heap size, the
+        number of nodes given a parent and the number of stale heap entries
+        popped and skipped.
+        """
+        num_cols = self.num_cols
+        goal_i, goal_j = divmod(goal, num_cols)
+        start_node = self.node_of[start]
+        goal_node = self.node_of[goal]
+        cells = self.cells
+        first = self.first
+        targets = self.targets
+        weights = self.weights
+
+        g_score = array("i", [-1]) * len(cells)
+        parent = array("i", [-1]) * len(cells)
+        parent_edge = array("i", [-1]) * len(cells)
+        closed = bytearray(len(cells))
+        g_score[start_node] = 0
+        open_set = [(0, 0, start_node)]
+        expanded = discovered = stale_pops = 0
+        peak = 1
+
+        while open_set:
+            _, negative_g, node = heappop(open_set)
+            if closed[node] or -negative_g > g_score[node]:
+                stale_pops += 1
+                continue
+            closed[node] = 1
+            expanded += 1
+            if check_cancelled is not None and not expanded % CANCEL_CHECK:
+                check_cancelled()
+
+            if node == goal_node:
+                path = self._expand(parent, parent_edge, start_node, node)
+                return path, expanded, peak, discovered, stale_pops
+
+            g = g_score[node]
+            for edge in range(first[node], first[node + 1]):
+                target = targets[edge]
+                if closed[target]:
+                    continue
+                # a dead end only leads back here, so never push one
+                if first[target + 1] - first[target] == 1 and target != goal_node:
+                    continue
+                tentative_g = g + weights[edge]
+                previous_g = g_score[target]
+                if previous_g != -1 and tentative_g >= previous_g:
+                    continue
+                if previous_g == -1:
+                    discovered += 1
+                g_score[target] = tentative_g
+                parent[target] = node
+                parent_edge[target] = edge
+                i, j = divmod(cells[target], num_cols)
+                h = abs(goal_i - i) + abs(goal_j - j)
+                heappush(open_set, (tentative_g + h, -tentative_g, target))
+            peak = max(peak, len(open_set))
+
+        return [], expanded, peak, discovered, stale_pops
+
+    def _expand(self, parent, parent_edge, start_node, end_node):
+        """
+        Walks the corridors of a node path to get back every (i, j) cell.
+        """
+        hops = []
+        node = end_node
+        while node != start_node:
+            hops.append((parent[node], parent_edge[node]))
+            node = parent[node]
+        hops.reverse()
+
+        cells = [self.cells[start_node]]
+        for node, edge in hops:
+            self._walk(self.cells[node], self.steps[edge], cells)
+        return [divmod(cell, self.num_cols) for cell in cells]
@@ -1,13 +1,305 @@
-from window import App
+import argparse
+import sys
+from time import perf_counter
 
-def main():
+from maze import Maze, SolveMethod, GenerateMethod
+import mazefile
+from grid import TOP, BOTTOM, LEFT, RIGHT
+
+
+def main(argv=None):
     """
     This main function serves as an entry point to the main app.
+
+    Without a command it opens the GUI. The generate, solve, benchmark and
+    export commands run headless and never import tkinter, so they work
+    without a display and start quickly.
+    """
+    parser = build_parser()
+    # everything after benchmark is handed on to the benchmark suite
+    args, bench_args = parser.parse_known_args(argv)
+    if args.command == "benchmark":
+        args.bench_args = bench_args
+    elif bench_args:
+        parser.error(f"unrecognized arguments: {' '.join(bench_args)}")
+    if args.command is None:
+        args.command = "gui"
+        args.width = 1920
+        args.height = 1080
+    return COMMANDS[args.command](args)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py", description="Generate, solve and visualize mazes."
+    )
+    commands = parser.add_subparsers(dest="command")
+
+    gui = commands.add_parser("gui", help="open the maze window")
+    gui.add_argument("--width", type=int, default=1920)
+    gui.add_argument("--height", type=int, default=1080)
+
+    generate = commands.add_parser("generate", help="generate a maze")
+    _add_maze_arguments(generate)
+    generate.add_argument(
+        "--show", action="store_true", help="print the maze as text"
+    )
+
+    solve = commands.add_parser("solve", help="generate a maze and solve it")
+    _add_maze_arguments(solve)
+    solve.add_argument("--input", help="solve a saved maze file instead")
+    solve.add_argument(
+        "--method",
+        type=_solve_method,
+        action="append",
+        help="SolveMethod name, can be given more than once (default dfs)",
+    )
+    solve.add_argument(
+        "--show", action="store_true", help="print the maze and the first path"
+    )
+    solve.add_argument("--stats", help="write phase times and counters as JSON")
+    solve.add_argument(
+        "--profile", action="store_true", help="add a cProfile of every phase"
+    )
+    solve.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="add the tracemalloc peak of every phase",
+    )
+
+    commands.add_parser(
+        "benchmark",
+        help="run the benchmark suite, see python -m benchmarks.bench --help",
+        add_help=False,
+    )
+
+    export = commands.add_parser("export", help="generate a maze into a file")
+    _add_maze_arguments(export)
+    export.add_argument(
+        "--format",
+        choices=["text", "maze", "raw", "ppm"],
+        default="text",
+        help="text art, a compact maze file, one wall mask byte per cell"
+        " or a PPM image (needs NumPy)",
+    )
+    export.add_argument(
+        "--method",
+        type=_solve_method,
+        help="solve with this SolveMethod and draw or store the path"
+        " (text and maze only)",
+    )
+    export.add_argument("--scale", type=int, default=4, help="PPM pixels per slot")
+    export.add_argument("--output", help="file to write, stdout by default")
+    return parser
+
+
+def _add_maze_arguments(parser):
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--cols", type=int, default=20)
+    parser.add_argument(
+        "--generator",
+        type=_generate_method,
+        default=GenerateMethod.BACKTRACKER,
+        help="GenerateMethod name (default backtracker)",
+    )
+    parser.add_argument("--seed", type=int)
+
+
+def _enum_parser(enum):
+    def parse(value):
+        try:
+            return enum[value.upper().replace("-", "_")]
+        except KeyError:
+            names = ", ".join(member.name.lower() for member in enum)
+            raise argparse.ArgumentTypeError(f"choose from {names}")
+
+    return parse
+
+
+_solve_method = _enum_parser(SolveMethod)
+_generate_method = _enum_parser(GenerateMethod)
+
+
+def _generate(args, stats=None):
+    maze = Maze(0, 0, args.rows, args.cols, 1, 1, None, args.seed)
+    start = perf_counter()
+    maze.generate(args.generator.value, stats)
+    return maze, perf_counter() - start
+
+
+def _print_generated(args, elapsed):
+    name = args.generator.name.lower()
+    print(f"{name} {args.rows}x{args.cols} time: {elapsed} seconds")
+
+
+def run_gui(args):
+    # Tk is only loaded once a window is actually asked for
+    from window import App
+
+    App(width=args.width, height=args.height)
+    return 0
+
+
+def run_generate(args):
+    maze, elapsed = _generate(args)
+    _print_generated(args, elapsed)
+    if args.show:
+        print(render_text(maze._grid))
+    return 0
+
+
+def run_solve(args):
+    stats = None
+    if args.stats is not None:
+        from stats import RunStats
+
+        stats = RunStats(args.profile, args.trace_memory)
+
+    if args.input is not None:
+        maze = Maze.load(args.input)
+        print(f"{args.input} {maze._num_rows}x{maze._num_cols}")
+    else:
+        maze, elapsed = _generate(args, stats)
+        _print_generated(args, elapsed)
+    paths = []
+    for method in args.method or [SolveMethod.DFS]:
+        result = maze.solve(method.value, headless=True, stats=stats)
+        paths.append(result.path)
+        print(
+            f"{result.algorithm}: path {len(result.path)}"
+            f" expanded {result.nodes_expanded} peak {result.peak_frontier}"
+            f" time: {result.elapsed} seconds"
+        )
+    if args.show:
+        print(render_text(maze._grid, paths[0]))
+    if stats is not None:
+        import json
+
+        with open(args.stats, "w") as file:
+            json.dump(stats.to_dict(), file, indent=2)
+    return 0 if all(paths) else 1
+
+
+def run_benchmark(args):
+    from benchmarks.bench import main as bench
+
+    return bench(args.bench_args)
+
+
+def run_export(args):
+    streams = args.format == "raw" or args.format == "maze" and args.method is None
+    if streams and args.generator == GenerateMethod.ELLER:
+        # Eller's algorithm streams row by row, so any size can be written
+        # without holding the maze, and the bytes match Maze.generate
+        import random
+        from generators import eller_maze_rows
+
+        rows = eller_maze_rows(args.rows, args.cols, random.Random(args.seed))
+        with _open_output(args.output, binary=True) as file:
+            if args.format == "maze":
+                mazefile.write_rows(
+                    file, args.rows, args.cols, rows, args.generator.value, args.seed
+                )
+            else:
+                for row in rows:
+                    file.write(row)
+        return 0
+
+    maze, _ = _generate(args)
+    if args.format == "maze":
+        if args.output is None:
+            raise SystemExit("export --format maze needs --output")
+        path = None
+        if args.method is not None:
+            path = maze.solve(args.method.value, headless=True).path
+        maze.save(args.output, path)
+    elif args.format == "raw":
+        with _open_output(args.output, binary=True) as file:
+            file.write(maze._grid.walls)
+    elif args.format == "ppm":
+        from raster import RasterLayout, to_ppm
+
+        layout = RasterLayout(
+            args.rows,
+            args.cols,
+            (2 * args.rows + 1) * args.scale,
+            (2 * args.cols + 1) * args.scale,
+        )
+        with _open_output(args.output, binary=True) as file:
+            file.write(to_ppm(layout.render(maze._grid.wall_array())))
+    else:
+        path = None
+        if args.method is not None:
+            path = maze.solve(args.method.value, headless=True).path
+        with _open_output(args.output) as file:
+            file.write(render_text(maze._grid, path) + "\n")
+    return 0
+
+
+def _open_output(path, binary=False):
+    if path is None:
+        stream = sys.stdout.buffer if binary else sys.stdout
+        return _KeepOpen(stream)
+    return open(path, "wb" if binary else "w")
+
+
+class _KeepOpen:
+    """
+    Lets stdout be used in a with block without closing it.
+    """
+    def __init__(self, stream):
+        self._stream = stream
+
+    def __enter__(self):
+        return self._stream
+
+    def __exit__(self, *exc):
+        self._stream.flush()
+
+
+def render_text(grid, path=None):
+    """
+    Draws the maze as text, walls as # and the path as dots. Like the window,
+    rows of the maze run left to right and columns top to bottom.
     """
-    width = 1920
-    height = 1080
-    App(width=width, height=height)
+    width = 2 * grid.num_rows + 1
+    height = 2 * grid.num_cols + 1
+    lines = [["#"] * width for _ in range(height)]
+
+    for index in range(len(grid)):
+        i, j = divmod(index, grid.num_cols)
+        walls = grid.walls[index]
+        x = 2 * i + 1
+        y = 2 * j + 1
+        lines[y][x] = " "
+        if not walls & BOTTOM:
+            lines[y + 1][x] = " "
+        if not walls & RIGHT:
+            lines[y][x + 1] = " "
+        if j == 0 and not walls & TOP:
+            lines[0][x] = " "
+        if i == 0 and not walls & LEFT:
+            lines[y][0] = " "
+
+    if path:
+        previous = None
+        for i, j in path:
+            lines[2 * j + 1][2 * i + 1] = "."
+            if previous is not None:
+                lines[j + previous[1] + 1][i + previous[0] + 1] = "."
+            previous = (i, j)
+
+    return "\n".join("".join(line) for line in lines)
+
+
+COMMANDS = {
+    "gui": run_gui,
+    "generate": run_generate,
+    "solve": run_solve,
+    "benchmark": run_benchmark,
+    "export": run_export,
+}
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,7 +1,27 @@
-from cell import Cell
-from time import sleep, time
+from cell import CellRows
+from generators import (
+    carve_backtracker,
+    carve_binary_tree,
+    carve_kruskal,
+    carve_sidewinder,
+    carve_wilson,
+    count_passages,
+    eller_rows,
+)
+from grid import Grid, TOP, BOTTOM, TILE_SIZE
+import mazefile
+from junctions import JunctionGraph
+from treeindex import TreeIndex
+from tiles import TiledGrid, TILE_CELLS, MAX_RESIDENT
+from time import perf_counter
 import random
+from collections import deque
+from heapq import heappush, heappop
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from queue import Queue, Full
+from threading import Event, Thread
+from dataclasses import dataclass, field
 from enum import Enum
 
 
@@ -9,6 +29,91 @@ class SolveMethod(Enum):
     DFS = 0
     BFS = 1
     ASTAR = 2
+    WEIGHTED_ASTAR = 3
+    GREEDY = 4
+    BIBFS = 5
+    JUNCTION = 6
+    DEADEND_FILL = 7
+
+
+class GenerateMethod(Enum):
+    BACKTRACKER = 0
+    ELLER = 1
+    KRUSKAL = 2
+    WILSON = 3
+    BINARY_TREE = 4
+    SIDEWINDER = 5
+    TILED = 6
+
+
+# Generators that carve the whole grid in one go, after which the finished
+# maze is drawn at once instead of cell by cell
+ONE_SHOT_GENERATORS = (
+    GenerateMethod.BINARY_TREE.value,
+    GenerateMethod.SIDEWINDER.value,
+    GenerateMethod.TILED.value,
+)
+
+
+@dataclass
+class SolveResult:
+    """
+    Outcome of a solve: the path of (i, j) cells from the entrance to the exit,
+    how many cells were expanded, the largest frontier held and the time spent
+    in the algorithm in seconds. discovered counts the cells given a parent
+    and stale_pops the outdated frontier entries popped and skipped, left
+    behind when a cell was pushed again with a cheaper cost or was closed.
+    """
+    algorithm: str
+    path: list = field(default_factory=list)
+    nodes_expanded: int = 0
+    peak_frontier: int = 0
+    elapsed: float = 0.0
+    discovered: int = 0
+    stale_pops: int = 0
+
+    @property
+    def found(self):
+        return bool(self.path)
+
+
+# Most draw events waiting to be played before the worker has to wait
+DRAW_QUEUE_SIZE = 65536
+
+
+class RunCancelled(Exception):
+    """
+    Raised inside a run that was cancelled, at its next draw call.
+    """
+
+
+class DrawQueue:
+    """
+    Stands in for the canvas while a maze is generated and solved. Every draw
+    call is put on a thread safe queue as (method name, args), and the
+    window's animation scheduler plays them back on the real canvas a few
+    events per frame.
+
+    Setting cancelled makes the next draw call raise RunCancelled, which is
+    how a run in a worker thread is stopped. Work that makes no draw calls
+    checks it through Maze._check_cancelled instead.
+    """
+    def __init__(self, size=DRAW_QUEUE_SIZE):
+        self.events = Queue(size)
+        self.cancelled = Event()
+
+    def __getattr__(self, name):
+        def record(*args):
+            while True:
+                if self.cancelled.is_set():
+                    raise RunCancelled()
+                try:
+                    self.events.put((name, args), timeout=0.1)
+                    return
+                except Full:
+                    continue
+
+        return record
 
 
 class Command(ABC):
@@ -41,12 +146,91 @@ class ChangeAnimationSpeed(Command):
         self.reciever.set_animation_draw_speed(speed)
 
 
+class ChangeRenderMode(Command):
+    def __init__(self, reciever):
+        self.reciever = reciever
+
+    def execute(self, raster):
+        self.reciever.set_render_mode(raster)
+
+
 class Run(Command):
     def __init__(self, reciever):
         self.reciever = reciever
 
-    def execute(self, solve_method, row_value, col_value):
-        self.reciever.run(solve_method, row_value, col_value)
+    def execute(
+        self,
+        solve_method,
+        row_value,
+        col_value,
+        generate_method=GenerateMethod.BACKTRACKER.value,
+    ):
+        self.reciever.run(solve_method, row_value, col_value, generate_method)
+
+
+class RunInBackground(Command):
+    def __init__(self, reciever):
+        self.reciever = reciever
+
+    def execute(
+        self,
+        solve_method,
+        row_value,
+        col_value,
+        generate_method=GenerateMethod.BACKTRACKER.value,
+    ):
+        self.reciever.start(
+            self.reciever.maze.run,
+            solve_method,
+            row_value,
+            col_value,
+            generate_method,
+        )
+
+
+class MazeWorker:
+    """
+    Runs generation and solving of a maze in a background thread, so the
+    window stays responsive. The worker only talks to the window through
+    the maze's draw event queue. Starting a new run cancels the current one
+    and waits for it, so the window only starts one once busy() is False.
+    """
+    def __init__(self, maze):
+        self.maze = maze
+        self._thread = None
+
+    def start(self, target, *args):
+        self.cancel()
+        self.join()
+        self._thread = Thread(target=self._work, args=(target, args), daemon=True)
+        self._thread.start()
+
+    def _work(self, target, args):
+        try:
+            target(*args)
+        except RunCancelled:
+            pass
+
+    def busy(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def cancel(self):
+        """
+        Asks the run in progress to stop without waiting for it, busy()
+        turns False once it has.
+        """
+        if self.busy():
+            self.maze.cancel()
+
+    def join(self, timeout=None):
+        """
+        Waits for a cancelled or finished run, for callers that can block.
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if not self.busy():
+            self._thread = None
+            self.maze.draw_cancelled.clear()
 
 
 class Maze:
@@ -60,9 +244,11 @@ class Maze:
         cell_size_y,
         win=None,
         seed=None,
-        animation_draw_speed=0.05,
+        animation_draw_speed=16,
+        astar_weight=2.0,
+        storage=None,
+        grid=None,
     ):
-        self._cells = []
         self._x1 = x1
         self._y1 = y1
         self._num_rows = num_rows
@@ -70,40 +256,264 @@ class Maze:
         self._cell_size_x = cell_size_x
         self._cell_size_y = cell_size_y
         self._win = win
+        self._canvas = DrawQueue() if win is not None else None
+        self._canvas_width = 2 * x1 + cell_size_x * num_rows
+        self._canvas_height = 2 * y1 + cell_size_y * num_cols
         self.animation_draw_speed = animation_draw_speed
+        self.astar_weight = astar_weight
+        # tile side and worker processes of GenerateMethod.TILED
+        self.carve_tile_size = TILE_SIZE
+        self.carve_workers = None
+        self.raster = False
         self.draw_state = False
-        random.seed(seed) if seed else None
+        self._storage = storage
+        self._tile_size = TILE_CELLS
+        self._max_resident = MAX_RESIDENT
+        # a grid passed in, such as one over a maze file, is used as it is
+        self._grid = self._new_grid() if grid is None else grid
+        self._adjacency_grid = None
+        self._adjacency_changes = 0
+        self._open_masks = None
+        self._offsets = None
+        self._junctions = None
+        self._tree_index = None
+        self._rng = random.Random(seed)
+        self.seed = seed
+        self.generate_method = None
+        self._file = None
+
+    @property
+    def _cells(self):
+        """
+        Cell views over the wall grid, indexed as _cells[i][j].
+        """
+        return CellRows(self._grid, self._canvas, self._cell_bounds)
 
-    def set_animation_draw_speed(self, speed: float | None = None) -> None:
+    def set_animation_draw_speed(self, speed: int | None = None) -> None:
+        """
+        Sets how many draw events the window plays back per frame, 0 plays
+        back as many as fit in a frame.
+        """
         if speed is not None:
             self.animation_draw_speed = speed
 
-    def get_animation_draw_speed(self) -> float:
+    def get_animation_draw_speed(self) -> int:
         return self.animation_draw_speed
 
-    def run(self, solve_method, row_value, col_value):
-        # TODO
+    @property
+    def draw_events(self):
+        """
+        Queue of (canvas method name, args) draw events for the window to play.
+        """
+        return self._canvas.events
+
+    def set_render_mode(self, raster: bool) -> None:
+        """
+        Raster mode paints the maze into a single image instead of one canvas
+        line per wall, for mazes too big to draw wall by wall.
+        """
+        self.raster = raster
+
+    def set_storage(self, directory=None, tile_size=None, max_resident=None):
+        """
+        Keeps the maze in memory mapped tile files under directory instead of
+        memory, for mazes larger than RAM, see tiles.TiledGrid. At most
+        max_resident tiles of tile_size cells are mapped per array at once.
+        None for the directory goes back to an in memory grid.
+        """
+        self._storage = directory
+        if tile_size is not None:
+            self._tile_size = tile_size
+        if max_resident is not None:
+            self._max_resident = max_resident
+        self._grid = self._new_grid()
+
+    def _new_grid(self):
+        if self._storage is None:
+            return Grid(self._num_rows, self._num_cols)
+        return TiledGrid(
+            self._num_rows,
+            self._num_cols,
+            self._storage,
+            self._tile_size,
+            self._max_resident,
+        )
+
+    def _draws_cells(self):
+        return self._win is not None and not self.raster
+
+    def run(
+        self,
+        solve_method,
+        row_value,
+        col_value,
+        generate_method=GenerateMethod.BACKTRACKER.value,
+        stats=None,
+    ):
         self.draw_state = True
-        self._change_maze_size(row_value, col_value)
-        self._create_cells()
-        self._break_entrance_and_exit()
-        (
-            self._break_walls_iteratively(0, 0)
-            if self._num_rows > 30 and self._num_cols > 30
-            else self._break_walls_r(0, 0)
+        try:
+            self._change_maze_size(row_value, col_value)
+            self.generate(generate_method, stats)
+            return self.solve(solve_method, stats=stats)
+        finally:
+            self.draw_state = False
+
+    def generate(
+        self, generate_method=GenerateMethod.BACKTRACKER.value, stats=None
+    ):
+        """
+        Creates the cells and carves a new maze into them. Without a window
+        nothing is drawn, so this can be used headless before solve.
+
+        With a stats.RunStats every phase is timed and the passages carved
+        are counted.
+        """
+        # Raster mode and the one shot generators skip drawing cell by cell,
+        # so the finished maze is drawn in one go
+        draw_all = self.raster or generate_method in ONE_SHOT_GENERATORS
+        with self._phase(stats, "create_cells"):
+            self._create_cells(draw=not draw_all)
+        self.generate_method = generate_method
+        match generate_method:
+            case GenerateMethod.BACKTRACKER.value:
+                with self._phase(stats, "entrance_and_exit"):
+                    self._break_entrance_and_exit()
+                with self._phase(stats, "carve"):
+                    carved = self._break_walls_iteratively(0, 0)
+            case GenerateMethod.ELLER.value:
+                with self._phase(stats, "carve"):
+                    carved = self._break_walls_eller()
+                with self._phase(stats, "entrance_and_exit"):
+                    self._break_entrance_and_exit()
+            case GenerateMethod.KRUSKAL.value:
+                with self._phase(stats, "entrance_and_exit"):
+                    self._break_entrance_and_exit()
+                with self._phase(stats, "carve"):
+                    carved = self._break_walls_kruskal()
+            case GenerateMethod.WILSON.value:
+                with self._phase(stats, "entrance_and_exit"):
+                    self._break_entrance_and_exit()
+                with self._phase(stats, "carve"):
+                    carved = self._break_walls_wilson()
+            case GenerateMethod.BINARY_TREE.value:
+                with self._phase(stats, "carve"):
+                    carved = carve_binary_tree(self._grid, self._rng.getrandbits(64))
+                with self._phase(stats, "entrance_and_exit"):
+                    self._open_entrance_and_exit()
+            case GenerateMethod.SIDEWINDER.value:
+                with self._phase(stats, "carve"):
+                    carved = carve_sidewinder(self._grid, self._rng.getrandbits(64))
+                with self._phase(stats, "entrance_and_exit"):
+                    self._open_entrance_and_exit()
+            case GenerateMethod.TILED.value:
+                from tiling import carve_tiled
+
+                with self._phase(stats, "carve"):
+                    carved = carve_tiled(
+                        self._grid,
+                        self._rng.getrandbits(64),
+                        self.carve_tile_size,
+                        self.carve_workers,
+                        self._cancel_hook(),
+                    )
+                with self._phase(stats, "entrance_and_exit"):
+                    self._open_entrance_and_exit()
+
+        if draw_all:
+            with self._phase(stats, "draw"):
+                self._draw_all_cells()
+        with self._phase(stats, "reset_visited"):
+            self._reset_visited()
+        if stats is not None:
+            stats.count("cells", len(self._grid))
+            stats.count("cells_carved", carved)
+
+    def _phase(self, stats, name):
+        """
+        Times a phase into stats, if there are any.
+        """
+        return stats.phase(name) if stats is not None else nullcontext()
+
+    def save(self, path, solution=None):
+        """
+        Saves the maze, and optionally a solution path, in the compact maze
+        file format, see mazefile.
+        """
+        mazefile.save(path, self._grid, self.generate_method, self.seed, solution)
+
+    @classmethod
+    def load(cls, path, writable=False):
+        """
+        Opens a maze file headless. The walls stay in the memory mapped file
+        and are read from there by the solvers, writable maps it for writing
+        so carving changes the file. Call close once done with it.
+        """
+        file = mazefile.load(path, writable)
+        maze = cls(
+            0, 0, file.num_rows, file.num_cols, 1, 1, None, file.seed, grid=file.grid()
         )
-        self._reset_visited()
-        self.solve(solve_method)
-        self.draw_state = False
+        maze.generate_method = file.generator
+        maze._file = file
+        return maze
+
+    def saved_solution(self):
+        """
+        Solution path stored in the maze file this maze was loaded from.
+        """
+        return self._file.solution() if self._file is not None else []
+
+    def close(self):
+        """
+        Closes the maze file a loaded maze reads its walls from.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
 
     def inital_run(self):
         self.draw_state = True
-        self._create_cells()
-        self._break_entrance_and_exit()
-        self._break_walls_iteratively(0, 0)
-        self._reset_visited()
-        self.solve()
-        self.draw_state = False
+        try:
+            self._create_cells()
+            self._break_entrance_and_exit()
+            self._break_walls_iteratively(0, 0)
+            self._reset_visited()
+            return self.solve()
+        finally:
+            self.draw_state = False
+
+    def cancel(self):
+        """
+        Asks a run in another thread to stop at its next draw call.
+        """
+        if self._canvas is not None:
+            self._canvas.cancelled.set()
+
+    @property
+    def draw_cancelled(self):
+        return self._canvas.cancelled
+
+    def _check_cancelled(self):
+        """
+        Raises RunCancelled once the run is cancelled, for the carvers and
+        solvers to call through their check_cancelled hooks.
+        """
+        if self._canvas.cancelled.is_set():
+            raise RunCancelled()
+
+    def _cancel_hook(self):
+        """
+        The check_cancelled hook to hand on, None without a window since
+        nothing can cancel a headless run.
+        """
+        return self._check_cancelled if self._canvas is not None else None
+
+    def set_canvas_size(self, width, height):
+        """
+        Size of the canvas the maze is drawn on, read on the window's thread so
+        runs in a worker never have to ask Tk.
+        """
+        self._canvas_width = width
+        self._canvas_height = height
 
     def _change_maze_size(self, row, column):
         """
@@ -113,421 +523,574 @@ class Maze:
             self._num_rows = row
         if column is not None:
             self._num_cols = column
-        self._cell_size_x = (
-            self._win.canvas.winfo_width() - 2 * self._x1
-        ) // self._num_rows
-        self._cell_size_y = (
-            self._win.canvas.winfo_height() - 2 * self._y1
-        ) // self._num_cols
+        self._cell_size_x = (self._canvas_width - 2 * self._x1) // self._num_rows
+        self._cell_size_y = (self._canvas_height - 2 * self._y1) // self._num_cols
 
-    def _create_cells(self):
+    def _create_cells(self, draw=True):
         """
-        Create maze cells
+        Create maze cells, drawing each one unless draw is False because the
+        whole maze is drawn once carved
         """
-        self._cells = []
-        for _ in range(self._num_rows):
-            col_list = []
-            for _ in range(self._num_cols):
-                col_list.append(Cell(self._win))
-            self._cells.append(col_list)
+        self._grid = self._new_grid()
+        if self._win:
+            self._canvas.clear_screen()
 
-        for i in range(self._num_rows):
-            for j in range(self._num_cols):
-                self._draw_cell(i, j)
+        if draw and self._draws_cells():
+            for i in range(self._num_rows):
+                for j in range(self._num_cols):
+                    self._draw_cell(i, j)
 
-    def _draw_cell(self, i, j):
+    def _cell_bounds(self, i, j):
         """
-        Draws each cell to the canvas.
+        Calculate position of cell from the canvas
         """
-        if not self._win:
-            return
-
-        # Get current cell to draw
-        cell = self._cells[i][j]
-
-        # Calculate position of cell from the canvas
         top_left_x = self._x1 + (self._cell_size_x * i)
         top_left_y = self._y1 + (self._cell_size_y * j)
         bottom_right_x = top_left_x + self._cell_size_x
         bottom_right_y = top_left_y + self._cell_size_y
+        return top_left_x, top_left_y, bottom_right_x, bottom_right_y
 
-        # Draw cell to canvas
-        cell.draw(top_left_x, top_left_y, bottom_right_x, bottom_right_y)
-        self._animate(self.animation_draw_speed)
-
-    def _animate(self, time=0.05):
+    def _draw_cell(self, i, j):
         """
-        Slows down the drawing animation
+        Draws each cell to the canvas.
         """
-        if not self._win:
+        if not self._draws_cells():
             return
-        self._win.redraw()
-        sleep(time)
+
+        # Get current cell to draw
+        cell = self._cells[i][j]
+
+        # Draw cell to canvas
+        cell.draw(*self._cell_bounds(i, j))
 
     def _break_entrance_and_exit(self):
         """
         Set the start and end goal by breaking down the walls.
         """
-        self._cells[0][0].has_top_wall = False
+        self._open_entrance_and_exit()
         self._draw_cell(0, 0)
-        self._cells[self._num_rows - 1][self._num_cols - 1].has_bottom_wall = False
         self._draw_cell(self._num_rows - 1, self._num_cols - 1)
 
-    def _break_walls_r(self, i, j):
+    def _open_entrance_and_exit(self):
+        self._grid.set_wall(0, TOP, False)
+        self._grid.set_wall(len(self._grid) - 1, BOTTOM, False)
+
+    def _break_walls_iteratively(self, i, j):
         """
-        Randomly break down walls between two cells.
+        Carves the maze with a depth first backtracker on an explicit stack,
+        so it works for any maze size without hitting the recursion limit.
         """
-        self._cells[i][j]._visited = True
-
-        while True:
-            to_visit = []
+        on_carve = self._draw_carve if self._draws_cells() else None
+        start = self._grid.index(i, j)
+        return carve_backtracker(
+            self._grid, start, self._rng, on_carve, self._cancel_hook()
+        )
 
-            to_visit.extend(self._check_adjacent_cells(i, j))
+    def _break_walls_kruskal(self):
+        """
+        Carves the maze with randomized Kruskal's algorithm.
+        """
+        on_carve = self._draw_carve if self._draws_cells() else None
+        return carve_kruskal(self._grid, self._rng, on_carve, self._cancel_hook())
 
-            if not to_visit:
-                cell = self._cells[i][j]
-                self._cells[i][j].draw(cell._x1, cell._y1, cell._x2, cell._y2)
-                return
+    def _break_walls_wilson(self):
+        """
+        Carves the maze with Wilson's loop erased random walks.
+        """
+        on_carve = self._draw_carve if self._draws_cells() else None
+        return carve_wilson(self._grid, self._rng, on_carve, self._cancel_hook())
 
-            random_direction = random.choice(to_visit)
-            self._break_walls((i, j), random_direction, random_direction[2])
-            self._break_walls_r(random_direction[0], random_direction[1])
-            self._animate(self.animation_draw_speed)
+    def _draw_all_cells(self):
+        """
+        Draws a maze that was carved in one go, either as a raster image or by
+        batching straight runs of walls into single canvas lines.
+        """
+        if not self._win:
+            return
+        self._canvas.clear_screen()
+        if self.raster:
+            self._canvas.draw_raster(
+                self._grid.wall_array().copy(),
+                self._x1,
+                self._y1,
+                self._canvas_width - 2 * self._x1,
+                self._canvas_height - 2 * self._y1,
+            )
+            return
+        self._canvas.draw_maze(
+            bytes(self._grid.walls),
+            self._num_rows,
+            self._num_cols,
+            self._x1,
+            self._y1,
+            self._cell_size_x,
+            self._cell_size_y,
+        )
 
-    def _break_walls_iteratively(self, i, j):
+    def _draw_carve(self, index, next_index):
         """
-        Breaks down the walls using iteration instead of recursion if the maze is too big.
+        Draws both cells of a passage that was just opened.
         """
-        to_visit = [(i, j)]
+        self._draw_cell(*divmod(index, self._num_cols))
+        self._draw_cell(*divmod(next_index, self._num_cols))
 
-        while to_visit:
-            # get current cell
-            current = to_visit.pop(-1)
-            current_cell = self._cells[current[0]][current[1]]
-            current_cell._visited = True
-
-            # get neighbors
-            neighbors = self._check_adjacent_cells(current[0], current[1])
-
-            # choose random direction
-            if neighbors:
-                random_direction = random.choice(neighbors)
-                self._break_walls(
-                    current,
-                    (random_direction[0], random_direction[1]),
-                    random_direction[2],
-                )
-                # draw current cell
-                current_cell.draw(
-                    current_cell._x1,
-                    current_cell._y1,
-                    current_cell._x2,
-                    current_cell._y2,
-                )
-
-                to_visit.extend(neighbors)
-                self._animate(self.animation_draw_speed)
-
-    def _check_adjacent_cells(self, i, j):
-        """
-        Checks adjacent nodes from the given cell index.
-        """
-        to_visit = []
-        # check above
-        if ((j + 1) > -1 and j + 1 < self._num_cols) and (
-            self._cells[i][j + 1]._visited == False
-        ):
-            to_visit.append((i, j + 1, "up"))
-        # check below
-        if ((j - 1) > -1 and j - 1 < self._num_cols) and (
-            self._cells[i][j - 1]._visited == False
-        ):
-            to_visit.append((i, j - 1, "down"))
-
-        # check left
-        if ((i - 1 > -1) and i - 1 < self._num_rows) and (
-            self._cells[i - 1][j]._visited == False
-        ):
-            to_visit.append((i - 1, j, "left"))
-
-        # check right
-        if ((i + 1 > -1) and i + 1 < self._num_rows) and (
-            self._cells[i + 1][j]._visited == False
-        ):
-            to_visit.append((i + 1, j, "right"))
-
-        return to_visit
-
-    def _break_walls(self, current, next, direction):
-        """
-        Breaks the walls from the current cell and next cell depending on the direction.
-        """
-        if direction == "up":
-            self._cells[current[0]][current[1]].has_bottom_wall = False
-            self._cells[next[0]][next[1]].has_top_wall = False
-        elif direction == "down":
-            self._cells[current[0]][current[1]].has_top_wall = False
-            self._cells[next[0]][next[1]].has_bottom_wall = False
-        elif direction == "left":
-            self._cells[current[0]][current[1]].has_left_wall = False
-            self._cells[next[0]][next[1]].has_right_wall = False
-        elif direction == "right":
-            self._cells[current[0]][current[1]].has_right_wall = False
-            self._cells[next[0]][next[1]].has_left_wall = False
-        else:
-            return
+    def _break_walls_eller(self):
+        """
+        Carves the maze row by row with Eller's algorithm and returns the
+        number of passages opened.
+        """
+        num_cols = self._num_cols
+        check_cancelled = self._cancel_hook()
+        carved = 0
+        for i, row in enumerate(eller_rows(self._num_rows, num_cols, self._rng)):
+            if check_cancelled is not None:
+                check_cancelled()
+            self._grid.walls[i * num_cols : (i + 1) * num_cols] = row
+            carved += count_passages(row)
+            if self._draws_cells():
+                for j in range(num_cols):
+                    self._draw_cell(i, j)
+        return carved
 
     def _reset_visited(self):
         """
         This sets all the cells back to unvisited.
         """
-        for i in range(self._num_rows):
-            for j in range(self._num_cols):
-                if self._cells[i][j]._visited:
-                    self._cells[i][j]._visited = False
+        self._grid.reset_visited()
+
+    def solve(
+        self, solve_method=SolveMethod.DFS.value, headless=False, stats=None
+    ):
+        """
+        Solves the maze from the entrance to the exit and returns a SolveResult.
 
-    def solve(self, solve_method=SolveMethod.DFS.value):
+        With headless set, or without a window, no draw calls are made and the
+        elapsed time only covers the search itself. A stats.RunStats gets the
+        phase times and the search counters.
+        """
+        draw = self._win is not None and not headless
+        with self._phase(stats, "reset_visited"):
+            self._reset_visited()
         match solve_method:
             case SolveMethod.DFS.value:
-                start = time()
-                self._solve_r(0, 0)
-                end = time()
                 algorithm = "Depth First Search"
+                search = self._solve_r
+                options = {}
             case SolveMethod.BFS.value:
-                start = time()
-                self._solve_bfs(0, 0)
-                end = time()
                 algorithm = "Breadth First Search"
+                search = self._solve_bfs
+                options = {}
+            case SolveMethod.BIBFS.value:
+                algorithm = "Bidirectional Breadth First Search"
+                search = self._solve_bibfs
+                options = {}
             case SolveMethod.ASTAR.value:
-                start = time()
-                self._solve_astar(0, 0)
-                end = time()
                 algorithm = "A*"
-        print(f"{algorithm} time: {end - start} seconds")
-
-    def _solve_r(self, i, j):
-        """
-        Simple Depth First Search pathing using recursion and backtracking.
-        """
-        self._animate(self.animation_draw_speed)
-
-        current_cell = self._cells[i][j]
-        current_cell._visited = True
-
-        if current_cell == self._cells[self._num_rows - 1][self._num_cols - 1]:
-            return True
-
-        directions = self._check_adjacent_cells(i, j)
-
-        # TODO make this look nicer lol
-        for direction in directions:
-            next_cell = self._cells[direction[0]][direction[1]]
-            if direction[2] == "up":
-                # check that the current cell bottom wall is not there
-                if not current_cell.has_bottom_wall and not next_cell.has_top_wall:
-                    current_cell.draw_move(next_cell)
-                    if self._solve_r(direction[0], direction[1]):
-                        return True
-                    else:
-                        current_cell.draw_move(next_cell, True)
-
-            elif direction[2] == "down":
-                # check that the current cell bottom wall is not there
-                if not current_cell.has_top_wall and not next_cell.has_bottom_wall:
-                    current_cell.draw_move(next_cell)
-                    if self._solve_r(direction[0], direction[1]):
-                        return True
-                    else:
-                        current_cell.draw_move(next_cell, True)
-
-            elif direction[2] == "left":
-                if not current_cell.has_left_wall and not next_cell.has_right_wall:
-                    current_cell.draw_move(next_cell)
-                    if self._solve_r(direction[0], direction[1]):
-                        return True
-                    else:
-                        current_cell.draw_move(next_cell, True)
-            else:
-                if not current_cell.has_right_wall and not next_cell.has_left_wall:
-                    current_cell.draw_move(next_cell)
-                    if self._solve_r(direction[0], direction[1]):
-                        return True
-                    else:
-                        current_cell.draw_move(next_cell, True)
-        return False
+                search = self._solve_astar
+                options = {}
+            case SolveMethod.WEIGHTED_ASTAR.value:
+                algorithm = f"Weighted A* (w={self.astar_weight})"
+                search = self._solve_astar
+                options = {"weight": self.astar_weight}
+            case SolveMethod.GREEDY.value:
+                algorithm = "Greedy Best First Search"
+                search = self._solve_astar
+                options = {"greedy": True}
+            case SolveMethod.JUNCTION.value:
+                algorithm = "Junction Graph A*"
+                search = self._solve_junctions
+                options = {}
+            case SolveMethod.DEADEND_FILL.value:
+                # loaded before the clock starts, so importing NumPy is not
+                # counted as solve time
+                import wavefront
+
+                algorithm = "Dead End Filling"
+                search = self._solve_deadend_fill
+                options = {}
+
+        with self._phase(stats, "solve"):
+            start = perf_counter()
+            path, expanded, peak, discovered, stale_pops = search(
+                0, 0, draw, **options
+            )
+            end = perf_counter()
+        result = SolveResult(
+            algorithm, path, expanded, peak, end - start, discovered, stale_pops
+        )
+        if stats is not None:
+            stats.count("nodes_expanded", expanded)
+            stats.count("stale_pops", stale_pops)
+            stats.count("came_from_size", discovered)
+            stats.maximum("frontier_peak", peak)
+            stats.count("path_length", len(path))
+        if draw:
+            print(f"{algorithm} time: {result.elapsed} seconds")
+        return result
+
+    def distance_field(self):
+        """
+        Distance from the entrance to every cell and the shortest path to the
+        exit, computed with vectorized NumPy sweeps. See wavefront.distance_field.
+        """
+        from wavefront import distance_field
 
-    def _solve_bfs(self, i, j):
+        return distance_field(self._grid)
+
+    def _adjacency(self):
         """
-        Simple breadth first search pathing
+        Open neighbour masks and the offsets table from Grid.open_masks and
+        Grid.neighbour_offsets, built once per maze and rebuilt when the grid
+        is replaced or its walls change through Grid.set_wall or Grid.carve.
         """
+        grid = self._grid
+        changed = self._adjacency_changes != grid.changes
+        if self._adjacency_grid is not grid or changed:
+            self._open_masks = grid.open_masks()
+            self._offsets = grid.neighbour_offsets()
+            self._junctions = None
+            self._tree_index = None
+            self._adjacency_grid = grid
+            self._adjacency_changes = grid.changes
+        return self._open_masks, self._offsets
+
+    def invalidate_adjacency(self):
+        """
+        Drops the cached adjacency, junction graph and tree index, for walls
+        written to the grid directly.
+        """
+        self._adjacency_grid = None
+        self._junctions = None
+        self._tree_index = None
 
-        # Instantiate start node and node queue
-        start = (i, j)
-        to_visit = [start]
+    def _junction_graph(self):
+        """
+        The corridor contracted JunctionGraph, cached along with the adjacency
+        it is built from.
+        """
+        open_masks, offsets = self._adjacency()
+        if self._junctions is None:
+            self._junctions = JunctionGraph(
+                self._grid, open_masks, offsets, self._cancel_hook()
+            )
+        return self._junctions
+
+    def tree_index(self):
+        """
+        The TreeIndex of the maze rooted at the entrance, built on first use
+        and cached along with the adjacency. Raises ValueError for mazes with
+        loops.
+        """
+        open_masks, offsets = self._adjacency()
+        if self._tree_index is None:
+            self._tree_index = TreeIndex(self._grid, open_masks, offsets)
+        return self._tree_index
 
-        came_from = {}
+    def path_between(self, start, goal):
+        """
+        The path between any two (i, j) cells of a perfect maze, empty if
+        there is none, answered from the tree index without a search.
+        """
+        num_cols = self._num_cols
+        return self.tree_index().path(
+            start[0] * num_cols + start[1], goal[0] * num_cols + goal[1]
+        )
 
-        # Get current node until queue is empty
-        while len(to_visit) != 0:
-            self._animate(self.animation_draw_speed)
-            current_cell = to_visit.pop(0)
-            i, j = current_cell[0], current_cell[1]
-            current_cell = self._cells[i][j]
-            current_cell._visited = True
+    def distance_between(self, start, goal):
+        """
+        Steps between any two (i, j) cells of a perfect maze, -1 if there is
+        no path, in O(log n) from the tree index.
+        """
+        num_cols = self._num_cols
+        return self.tree_index().distance(
+            start[0] * num_cols + start[1], goal[0] * num_cols + goal[1]
+        )
 
-            # Found Goal Cell
-            if current_cell == self._cells[self._num_rows - 1][self._num_cols - 1]:
-
-                # TODO just make this into another function too much for this
-                # Backtrack to get the path the algorithm took
-                path = []
-                traversal = (i, j)
-                while traversal in came_from:
-                    path.append(traversal)
-                    traversal = came_from[traversal]
-                path.append(start)
-                path.reverse()
-
-                # Highlights the path from start to finish
-                for index in range(len(path) - 1):
-                    current = path[index]
-                    next = path[index + 1]
-                    current_node = self._cells[current[0]][current[1]]
-                    next_node = self._cells[next[0]][next[1]]
-                    current_node.draw_move(next_node, True)
-
-                return True
+    def _draw_move(self, current, next, undo=False):
+        if self.raster:
+            self._canvas.blit_move(current, next, "red" if undo else "green")
+            return
+        self._cells[current[0]][current[1]].draw_move(
+            self._cells[next[0]][next[1]], undo
+        )
 
-            # Get next valid cell to move
-            neighbors = self._check_adjacent_cells(i, j)
+    def _draw_path(self, path):
+        """
+        Highlights the path from start to finish as one line.
+        """
+        if self.raster:
+            for step in range(len(path) - 1):
+                self._canvas.blit_move(path[step], path[step + 1], "red")
+            return
+        self._canvas.draw_path(
+            [self._cells[i][j].center() for i, j in path]
+        )
 
-            for neighbor in neighbors:
-                # Find next cell to move
-                next_cell = self._cells[neighbor[0]][neighbor[1]]
-                direction = neighbor[2]
+    def _solve_r(self, i, j, draw=True):
+        """
+        Depth First Search pathing with backtracking, using an explicit stack so
+        large mazes do not run into the recursion limit.
+        """
+        num_cols = self._num_cols
+        goal = len(self._grid) - 1
+        visited = self._grid.visited
+        open_masks, offsets = self._adjacency()
+
+        index = i * num_cols + j
+        visited[index] = 1
+        stack = [index]
+        options = [iter(offsets[open_masks[index]])]
+        expanded = peak = 1
+
+        while stack:
+            index = stack[-1]
+            if index == goal:
+                path = [divmod(cell, num_cols) for cell in stack]
+                return path, expanded, peak, expanded - 1, 0
+
+            # move into the next unvisited open cell, or backtrack
+            for offset in options[-1]:
+                next_index = index + offset
+                if not visited[next_index]:
+                    break
+            else:
+                stack.pop()
+                options.pop()
+                if draw and stack:
+                    self._draw_move(
+                        divmod(stack[-1], num_cols), divmod(index, num_cols), True
+                    )
+                continue
+
+            if draw:
+                self._draw_move(divmod(index, num_cols), divmod(next_index, num_cols))
+            visited[next_index] = 1
+            stack.append(next_index)
+            options.append(iter(offsets[open_masks[next_index]]))
+            expanded += 1
+            peak = max(peak, len(stack))
+
+        return [], expanded, peak, expanded - 1, 0
+
+    def _path_from_parents(self, parent, start, end):
+        """
+        Backtrack through a flat array of parent indices to get the path from
+        start to end as (i, j) cells.
+        """
+        path = []
+        index = end
+        while index != start:
+            path.append(divmod(index, self._num_cols))
+            index = parent[index]
+        path.append(divmod(start, self._num_cols))
+        path.reverse()
+        return path
+
+    def _solve_bfs(self, i, j, draw=True):
+        """
+        Simple breadth first search pathing
+        """
 
-                # TODO possibly make this into another function for readability
-                if direction == "up":
-                    if not current_cell.has_bottom_wall and not next_cell.has_top_wall:
-                        current_cell.draw_move(next_cell)
-                        to_visit.append(neighbor)
-                        came_from[(neighbor[0], neighbor[1])] = (i, j)
+        # Instantiate start node and node queue
+        num_cols = self._num_cols
+        start = i * num_cols + j
+        goal = len(self._grid) - 1
+        visited = self._grid.visited
+        open_masks, offsets = self._adjacency()
+        parent = self._grid.allocate("i", -1)
+        to_visit = deque([start])
+        visited[start] = 1
+        expanded = 0
+        peak = 1
 
-                elif direction == "down":
-                    if not current_cell.has_top_wall and not next_cell.has_bottom_wall:
-                        current_cell.draw_move(next_cell)
-                        to_visit.append(neighbor)
-                        came_from[(neighbor[0], neighbor[1])] = (i, j)
+        # Get current node until queue is empty
+        while to_visit:
+            index = to_visit.popleft()
+            expanded += 1
 
-                elif direction == "left":
-                    if not current_cell.has_left_wall and not next_cell.has_right_wall:
-                        current_cell.draw_move(next_cell)
-                        to_visit.append(neighbor)
-                        came_from[(neighbor[0], neighbor[1])] = (i, j)
+            # Found Goal Cell
+            if index == goal:
+                path = self._path_from_parents(parent, start, goal)
 
-                else:
-                    if not current_cell.has_right_wall and not next_cell.has_left_wall:
-                        to_visit.append(neighbor)
-                        current_cell.draw_move(next_cell)
-                        came_from[(neighbor[0], neighbor[1])] = (i, j)
+                if draw:
+                    self._draw_path(path)
 
-        return False
+                return path, expanded, peak, expanded + len(to_visit) - 1, 0
 
-    def _solve_astar(self, i, j):
+            # Get next valid cell to move
+            for offset in offsets[open_masks[index]]:
+                next_index = index + offset
+                if visited[next_index]:
+                    continue
+                visited[next_index] = 1
+                parent[next_index] = index
+                if draw:
+                    self._draw_move(
+                        divmod(index, num_cols), divmod(next_index, num_cols)
+                    )
+                to_visit.append(next_index)
+            peak = max(peak, len(to_visit))
+
+        return [], expanded, peak, expanded - 1, 0
+
+    def _solve_bibfs(self, i, j, draw=True):
+        """
+        Bidirectional breadth first search. One search starts at the entrance
+        and one at the exit, and the smaller frontier is expanded a whole level
+        at a time until the two meet in the middle.
         """
-        A simplified version of the A* algorithm using a basic heuristic to find the finish line.
+        size = len(self._grid)
+        start = i * self._num_cols + j
+        goal = size - 1
+        if start == goal:
+            return [(i, j)], 1, 1, 0, 0
+
+        # index 0 searches from the entrance, index 1 from the exit
+        num_cols = self._num_cols
+        open_masks, offsets = self._adjacency()
+        grid = self._grid
+        distances = (grid.allocate("i", -1), grid.allocate("i", -1))
+        parents = (grid.allocate("i", -1), grid.allocate("i", -1))
+        frontiers = (deque([start]), deque([goal]))
+        distances[0][start] = 0
+        distances[1][goal] = 0
+        expanded = 0
+        peak = 2
+
+        while frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            frontier = frontiers[side]
+            distance = distances[side]
+            parent = parents[side]
+            other = distances[1 - side]
+            meet = -1
+            best = 0
+
+            for _ in range(len(frontier)):
+                index = frontier.popleft()
+                expanded += 1
+                for offset in offsets[open_masks[index]]:
+                    next_index = index + offset
+                    if distance[next_index] != -1:
+                        continue
+                    distance[next_index] = distance[index] + 1
+                    parent[next_index] = index
+                    frontier.append(next_index)
+                    if draw:
+                        self._draw_move(
+                            divmod(index, num_cols), divmod(next_index, num_cols)
+                        )
+
+                    # Keep the shortest meeting point found in this level
+                    if other[next_index] != -1:
+                        length = distance[next_index] + other[next_index]
+                        if meet == -1 or length < best:
+                            meet = next_index
+                            best = length
+            peak = max(peak, len(frontiers[0]) + len(frontiers[1]))
+
+            if meet != -1:
+                path = self._path_from_parents(parents[0], start, meet)
+                back = self._path_from_parents(parents[1], goal, meet)
+                path.extend(reversed(back[:-1]))
+
+                if draw:
+                    self._draw_path(path)
+
+                discovered = expanded + len(frontiers[0]) + len(frontiers[1]) - 2
+                return path, expanded, peak, discovered, 0
+
+        discovered = expanded + len(frontiers[0]) + len(frontiers[1]) - 2
+        return [], expanded, peak, discovered, 0
+
+    def _solve_astar(self, i, j, draw=True, weight=1.0, greedy=False):
         """
+        A* pathing on a binary heap with lazy deletion and a closed set.
 
-        # Instantiate start position and node queue
-        start = (0, (i, j))
-        open_set = [start]
-        came_from = {}
-        g_score = {start[1]: 0}
+        Cells are ordered by f = g + weight * h, ties going to the larger g so
+        the search keeps pushing along the current corridor. A weight above 1
+        gives weighted A*, and greedy orders by h alone (greedy best first).
+        Both trade the shortest path for fewer expansions.
+        """
+        num_cols = self._num_cols
+        start = i * num_cols + j
+        goal = len(self._grid) - 1
+        # Manhattan distance to the exit is corner - i - j
+        corner = self._num_rows - 1 + num_cols - 1
+        closed = self._grid.visited
+        open_masks, offsets = self._adjacency()
+        h = corner - i - j
+        open_set = [(h if greedy else weight * h, 0, start)]
+        parent = self._grid.allocate("i", -1)
+        g_score = self._grid.allocate("i", -1)
+        g_score[start] = 0
+        expanded = discovered = stale_pops = 0
+        peak = 1
 
         # While there are nodes to visit
         while open_set:
-            # Draw the move from one cell to another
-            self._animate(self.animation_draw_speed)
+            _, negative_g, index = heappop(open_set)
 
-            # Get current node
-            f_score, current = open_set.pop(0)
-            current_cell = self._cells[current[0]][current[1]]
-            current_cell.visited = True
+            # Stale entry left behind by a cheaper push of the same cell
+            if closed[index] or -negative_g > g_score[index]:
+                stale_pops += 1
+                continue
+
+            closed[index] = 1
+            expanded += 1
 
             # End goal would be the last cell
-            if current == (self._num_rows - 1, self._num_cols - 1):
-                return True
-
-            neighbors = self._check_adjacent_cells(current[0], current[1])
-
-            for neighbor in neighbors:
-                next_cell = self._cells[neighbor[0]][neighbor[1]]
-                direction = neighbor[2]
-                tentative_g = g_score[current] + 1
-
-                if (neighbor[0], neighbor[1]) not in g_score or tentative_g < g_score[
-                    (neighbor[0], neighbor[1])
-                ]:
-                    if direction == "up":
-                        if (
-                            not current_cell.has_bottom_wall
-                            and not next_cell.has_top_wall
-                        ):
-                            g_score[(neighbor[0], neighbor[1])] = tentative_g
-                            f_score = tentative_g + self._astar_heuristic(
-                                (neighbor[0], neighbor[1])
-                            )
-                            open_set.append((f_score, (neighbor[0], neighbor[1])))
-                            current_cell.draw_move(next_cell)
-                            came_from[(neighbor[0], neighbor[1])] = current
-
-                    elif direction == "down":
-                        if (
-                            not current_cell.has_top_wall
-                            and not next_cell.has_bottom_wall
-                        ):
-                            g_score[(neighbor[0], neighbor[1])] = tentative_g
-                            f_score = tentative_g + self._astar_heuristic(
-                                (neighbor[0], neighbor[1])
-                            )
-                            open_set.append((f_score, (neighbor[0], neighbor[1])))
-                            current_cell.draw_move(next_cell)
-
-                            came_from[(neighbor[0], neighbor[1])] = current
-
-                    elif direction == "left":
-                        if (
-                            not current_cell.has_left_wall
-                            and not next_cell.has_right_wall
-                        ):
-                            g_score[(neighbor[0], neighbor[1])] = tentative_g
-                            f_score = tentative_g + self._astar_heuristic(
-                                (neighbor[0], neighbor[1])
-                            )
-                            open_set.append((f_score, (neighbor[0], neighbor[1])))
-                            current_cell.draw_move(next_cell)
-
-                            came_from[(neighbor[0], neighbor[1])] = current
-                    else:
-                        if (
-                            not current_cell.has_right_wall
-                            and not next_cell.has_left_wall
-                        ):
-                            g_score[(neighbor[0], neighbor[1])] = tentative_g
-                            f_score = tentative_g + self._astar_heuristic(
-                                (neighbor[0], neighbor[1])
-                            )
-                            open_set.append((f_score, (neighbor[0], neighbor[1])))
-                            current_cell.draw_move(next_cell)
-
-                            came_from[(neighbor[0], neighbor[1])] = current
-
-        return False
-
-    def _astar_heuristic(self, start):
-        """
-        Using the Manhattan Distance Formula as the heuristic
-        """
-        return abs(start[0] - (self._num_rows - 1)) + abs(
-            start[1] - (self._num_cols - 2)
+            if index == goal:
+                path = self._path_from_parents(parent, start, index)
+                return path, expanded, peak, discovered, stale_pops
+
+            tentative_g = g_score[index] + 1
+            for offset in offsets[open_masks[index]]:
+                next_index = index + offset
+                if closed[next_index]:
+                    continue
+                previous_g = g_score[next_index]
+                if previous_g != -1 and tentative_g >= previous_g:
+                    continue
+                if previous_g == -1:
+                    discovered += 1
+
+                g_score[next_index] = tentative_g
+                parent[next_index] = index
+                next_i, next_j = divmod(next_index, num_cols)
+                h = corner - next_i - next_j
+                f_score = h if greedy else tentative_g + weight * h
+                heappush(open_set, (f_score, -tentative_g, next_index))
+                if draw:
+                    self._draw_move(divmod(index, num_cols), (next_i, next_j))
+            peak = max(peak, len(open_set))
+
+        return [], expanded, peak, discovered, stale_pops
+
+    def _solve_junctions(self, i, j, draw=True):
+        """
+        A* over the junction graph, where every corridor is a single weighted
+        edge, then expanded back into the full path of cells. Expansions
+        count junctions rather than cells.
+        """
+        graph = self._junction_graph()
+        path, expanded, peak, discovered, stale_pops = graph.search(
+            i * self._num_cols + j, len(self._grid) - 1, self._cancel_hook()
+        )
+        if draw and path:
+            self._draw_path(path)
+        return path, expanded, peak, discovered, stale_pops
+
+    def _solve_deadend_fill(self, i, j, draw=True):
+        """
+        Vectorized dead end filling, see wavefront.dead_end_fill. Needs NumPy
+        and a perfect maze. Every filled cell and path cell counts as expanded.
+        """
+        from wavefront import dead_end_fill
+
+        path, filled, peak = dead_end_fill(
+            self._grid, (i, j), check_cancelled=self._cancel_hook()
         )
+        if draw and path:
+            self._draw_path(path)
+        return path, filled + len(path), peak, 0, 0
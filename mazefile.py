@@ -0,0 +1,328 @@
+"""
+Compact binary maze files.
+
+A file is a fixed header followed by the wall masks packed two cells per
+byte, cell 2k in the low nibble and 2k + 1 in the high one, in Grid index
+order. An optional solution follows as a stream of 2 bit steps, four per
+byte starting at the low bits, walked from the entrance cell.
+
+Loading maps the file with mmap, so opening is instant whatever its size and
+the solvers read the walls straight out of the mapping.
+"""
+import mmap
+import struct
+
+from grid import Grid, TOP, RIGHT, BOTTOM, LEFT
+
+MAGIC = b"MAZE"
+VERSION = 1
+
+# magic, version, generator, flags, reserved, rows, cols, seed, entrance,
+# exit and number of solution steps
+HEADER = struct.Struct("<4sBBBxIIqQQQ")
+
+# header flags
+HAS_SEED = 1
+
+# generator value stored when the maze was not made by a GenerateMethod
+NO_GENERATOR = 255
+
+# cells packed per write while streaming
+CHUNK = 1 << 20
+
+# 2 bit step codes, and the (di, dj) each one moves
+STEPS = [TOP, RIGHT, BOTTOM, LEFT]
+STEP_MOVES = {TOP: (0, -1), RIGHT: (1, 0), BOTTOM: (0, 1), LEFT: (-1, 0)}
+STEP_CODES = {STEP_MOVES[wall]: code for code, wall in enumerate(STEPS)}
+
+_LOW = bytes(value & 0x0F for value in range(256))
+_HIGH = bytes(value >> 4 for value in range(256))
+_SHIFT = bytes((value & 0x0F) << 4 for value in range(256))
+
+
+class MazeFileError(ValueError):
+    pass
+
+
+def packed_size(num_cells):
+    return (num_cells + 1) // 2
+
+
+def pack(cells):
+    """
+    Packs an even number of wall masks (or any number, for the last chunk)
+    two per byte.
+    """
+    low = bytes(cells[0::2])
+    high = bytes(cells[1::2]).translate(_SHIFT).ljust(len(low), b"\0")
+    size = len(low)
+    merged = int.from_bytes(low, "little") | int.from_bytes(high, "little")
+    return merged.to_bytes(size, "little")
+
+
+def unpack(data, num_cells):
+    """
+    Unpacks num_cells wall masks from packed bytes into a bytearray.
+    """
+    cells = bytearray(num_cells)
+    cells[0::2] = bytes(data[: packed_size(num_cells)]).translate(_LOW)
+    cells[1::2] = bytes(data[: num_cells // 2]).translate(_HIGH)
+    return cells
+
+
+class PackedWalls:
+    """
+    Wall masks stored 4 bits per cell in any byte buffer, indexed like the
+    bytearray Grid normally holds. Reads and writes go straight to the buffer,
+    so a Grid over a mapped file never copies it.
+    """
+    def __init__(self, data, num_cells):
+        self._data = data
+        self._num_cells = num_cells
+
+    def __len__(self):
+        return self._num_cells
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop = self._slice_bounds(index)
+            # whole bytes from the even cell at or before start
+            first = start & ~1
+            cells = unpack(self._data[first >> 1 : (stop + 1) >> 1], stop - first)
+            return cells[start - first :]
+        if index < 0:
+            index += self._num_cells
+        if not 0 <= index < self._num_cells:
+            raise IndexError("cell index out of range")
+        if index & 1:
+            return self._data[index >> 1] >> 4
+        return self._data[index >> 1] & 0x0F
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            start, stop = self._slice_bounds(index)
+            if len(value) != stop - start:
+                raise ValueError("slice assignment cannot change the cell count")
+            if start < stop and start & 1:
+                self[start] = value[0]
+                value = value[1:]
+                start += 1
+            # whole bytes in one go, an odd cell left at the end on its own
+            end = start + ((stop - start) & ~1)
+            for first in range(start, end, CHUNK):
+                last = min(first + CHUNK, end)
+                self._data[first >> 1 : last >> 1] = pack(
+                    value[first - start : last - start]
+                )
+            if end < stop:
+                self[end] = value[-1]
+            return
+        if index < 0:
+            index += self._num_cells
+        if not 0 <= index < self._num_cells:
+            raise IndexError("cell index out of range")
+        byte = self._data[index >> 1]
+        if index & 1:
+            self._data[index >> 1] = (byte & 0x0F) | (value & 0x0F) << 4
+        else:
+            self._data[index >> 1] = (byte & 0xF0) | (value & 0x0F)
+
+    def __iter__(self):
+        return iter(self.unpack())
+
+    def _slice_bounds(self, index):
+        start, stop, step = index.indices(self._num_cells)
+        if step != 1:
+            raise ValueError("packed walls only take slices with a step of 1")
+        return start, max(start, stop)
+
+    def unpack(self):
+        """
+        Copy of all the masks as a plain bytearray.
+        """
+        return unpack(self._data, self._num_cells)
+
+
+def write_header(
+    file,
+    num_rows,
+    num_cols,
+    generator=None,
+    seed=None,
+    entrance=0,
+    exit=None,
+    solution_steps=0,
+):
+    flags = 0
+    if seed is not None:
+        if not -(1 << 63) <= seed < 1 << 63:
+            raise MazeFileError("seed does not fit in 64 bits")
+        flags |= HAS_SEED
+    file.write(
+        HEADER.pack(
+            MAGIC,
+            VERSION,
+            NO_GENERATOR if generator is None else generator,
+            flags,
+            num_rows,
+            num_cols,
+            0 if seed is None else seed,
+            entrance,
+            num_rows * num_cols - 1 if exit is None else exit,
+            solution_steps,
+        )
+    )
+
+
+def write_rows(file, num_rows, num_cols, rows, generator=None, seed=None):
+    """
+    Writes a maze file from an iterable of wall mask rows, such as
+    generators.eller_rows, holding only a chunk of cells at a time.
+    """
+    write_header(file, num_rows, num_cols, generator, seed)
+    pending = bytearray()
+    for row in rows:
+        pending += row
+        if len(pending) >= CHUNK:
+            even = len(pending) & ~1
+            file.write(pack(pending[:even]))
+            del pending[:even]
+    if pending:
+        file.write(pack(pending))
+
+
+def save(path, grid, generator=None, seed=None, solution=None):
+    """
+    Saves a Grid, and optionally a solution path of (i, j) cells starting at
+    the entrance, into a maze file.
+    """
+    steps = encode_path(solution) if solution else b""
+    with open(path, "wb") as file:
+        write_header(
+            file,
+            grid.num_rows,
+            grid.num_cols,
+            generator,
+            seed,
+            solution_steps=len(solution) - 1 if solution else 0,
+        )
+        walls = grid.walls
+        if isinstance(walls, PackedWalls):
+            # already in the file layout, so the bytes are copied as they are
+            file.write(walls._data[: packed_size(len(grid))])
+        else:
+            for start in range(0, len(grid), CHUNK):
+                file.write(pack(walls[start : start + CHUNK]))
+        file.write(steps)
+
+
+def encode_path(path):
+    """
+    Packs the steps of a path of adjacent (i, j) cells into 2 bits each.
+    """
+    data = bytearray((len(path) + 2) // 4)
+    for step in range(len(path) - 1):
+        (i, j), (next_i, next_j) = path[step], path[step + 1]
+        move = (next_i - i, next_j - j)
+        if move not in STEP_CODES:
+            raise MazeFileError("solution cells are not adjacent")
+        data[step >> 2] |= STEP_CODES[move] << 2 * (step & 3)
+    return data
+
+
+def decode_path(data, start, steps):
+    """
+    Walks 2 bit steps from the start (i, j) cell back into a path.
+    """
+    i, j = start
+    path = [(i, j)]
+    for step in range(steps):
+        di, dj = STEP_MOVES[STEPS[data[step >> 2] >> 2 * (step & 3) & 3]]
+        i += di
+        j += dj
+        path.append((i, j))
+    return path
+
+
+class MazeFile:
+    """
+    A maze file mapped into memory. The header fields are attributes, grid()
+    gives a Grid reading the walls from the mapping and solution() the stored
+    path, if any. Close it, or use it in a with block, once done.
+    """
+    def __init__(self, path, writable=False):
+        self._file = open(path, "r+b" if writable else "rb")
+        try:
+            self._map = mmap.mmap(
+                self._file.fileno(),
+                0,
+                access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ,
+            )
+        except ValueError:
+            self._file.close()
+            raise MazeFileError(f"{path} is empty")
+
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise MazeFileError(f"{path} is too short for a maze file")
+        (
+            magic,
+            version,
+            generator,
+            flags,
+            self.num_rows,
+            self.num_cols,
+            seed,
+            self.entrance,
+            self.exit,
+            self.solution_steps,
+        ) = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise MazeFileError(f"{path} is not a version {VERSION} maze file")
+        self.generator = None if generator == NO_GENERATOR else generator
+        self.seed = seed if flags & HAS_SEED else None
+
+        num_cells = self.num_rows * self.num_cols
+        walls_end = HEADER.size + packed_size(num_cells)
+        if len(self._map) < walls_end + (self.solution_steps + 3) // 4:
+            self.close()
+            raise MazeFileError(f"{path} is truncated")
+        self._view = memoryview(self._map)
+        self._walls = self._view[HEADER.size : walls_end]
+        self._solution = self._view[walls_end:]
+
+    def grid(self):
+        """
+        Grid over the mapped walls. Its visited array is only allocated once
+        something uses it.
+        """
+        return Grid(
+            self.num_rows,
+            self.num_cols,
+            walls=PackedWalls(self._walls, self.num_rows * self.num_cols),
+        )
+
+    def solution(self):
+        if not self.solution_steps:
+            return []
+        start = divmod(self.entrance, self.num_cols)
+        return decode_path(self._solution, start, self.solution_steps)
+
+    def close(self):
+        if hasattr(self, "_view"):
+            self._walls.release()
+            self._solution.release()
+            self._view.release()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load(path, writable=False):
+    return MazeFile(path, writable)
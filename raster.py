@@ -0,0 +1,84 @@
+import numpy as np
+
+from grid import TOP, RIGHT, BOTTOM, LEFT
+
+WALL_COLOR = (0, 0, 0)
+OPEN_COLOR = (255, 255, 255)
+
+
+class RasterLayout:
+    """
+    Maps the lattice of a maze onto a width x height pixel area.
+
+    The lattice has one slot per cell and one per wall between them, so cell
+    (i, j) sits at lattice column 2 * i + 1 and lattice row 2 * j + 1. Every
+    pixel samples the nearest lattice slot, which keeps the cost of a frame
+    tied to the pixel count however many cells the maze has.
+    """
+    def __init__(self, num_rows, num_cols, width, height):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.width = width
+        self.height = height
+        self.lattice_x = 2 * num_rows + 1
+        self.lattice_y = 2 * num_cols + 1
+
+    def _span(self, first, last, lattice, pixels):
+        start = min(-(-first * pixels // lattice), pixels - 1)
+        end = min(-(-(last + 1) * pixels // lattice), pixels)
+        return start, max(end, start + 1)
+
+    def cells_rectangle(self, current, next):
+        """
+        Pixel rectangle (x1, y1, x2, y2), end exclusive, covering two cells
+        and the wall slot between them.
+        """
+        first_x, last_x = sorted((2 * current[0] + 1, 2 * next[0] + 1))
+        first_y, last_y = sorted((2 * current[1] + 1, 2 * next[1] + 1))
+        x1, x2 = self._span(first_x, last_x, self.lattice_x, self.width)
+        y1, y2 = self._span(first_y, last_y, self.lattice_y, self.height)
+        return x1, y1, x2, y2
+
+    def render(self, walls):
+        """
+        Paints the (num_rows, num_cols) wall mask array into a
+        (height, width, 3) uint8 RGB pixel buffer.
+        """
+        xs = np.arange(self.width) * self.lattice_x // self.width
+        ys = np.arange(self.height) * self.lattice_y // self.height
+        x_cell = xs % 2 == 1
+        y_cell = ys % 2 == 1
+        is_open = np.zeros((self.height, self.width), dtype=bool)
+
+        # cells are always open and wall corners never are
+        is_open[np.ix_(y_cell, x_cell)] = True
+
+        # TOP/BOTTOM walls: a cell column crossing a wall row
+        i = xs[x_cell] // 2
+        wall_ys = ys[~y_cell]
+        j = np.maximum(wall_ys // 2 - 1, 0)
+        bit = np.where(wall_ys == 0, TOP, BOTTOM).astype(np.uint8)
+        is_open[np.ix_(~y_cell, x_cell)] = (
+            walls[i[None, :], j[:, None]] & bit[:, None]
+        ) == 0
+
+        # LEFT/RIGHT walls: a wall column crossing a cell row
+        wall_xs = xs[~x_cell]
+        i = np.maximum(wall_xs // 2 - 1, 0)
+        j = ys[y_cell] // 2
+        bit = np.where(wall_xs == 0, LEFT, RIGHT).astype(np.uint8)
+        is_open[np.ix_(y_cell, ~x_cell)] = (
+            walls[i[None, :], j[:, None]] & bit[None, :]
+        ) == 0
+
+        palette = np.array([WALL_COLOR, OPEN_COLOR], dtype=np.uint8)
+        return palette[is_open.view(np.uint8)]
+
+
+def to_ppm(pixels):
+    """
+    Binary PPM image data for a (height, width, 3) uint8 pixel buffer, the
+    format PhotoImage can load straight from memory.
+    """
+    height, width, _ = pixels.shape
+    return b"P6 %d %d 255\n" % (width, height) + pixels.tobytes()
@@ -0,0 +1,114 @@
+"""
+Instrumentation for maze runs.
+
+Pass a RunStats into Maze.run, Maze.generate or Maze.solve and it collects
+the time spent in every phase of the run along with counters such as cells
+carved, nodes expanded and the frontier peak. Profiling with cProfile and
+peak memory with tracemalloc can be switched on per RunStats, and to_dict
+exports everything as plain data.
+"""
+import cProfile
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+from time import perf_counter
+
+# functions kept per phase profile, by cumulative time
+PROFILE_LIMIT = 25
+
+
+class RunStats:
+    def __init__(self, profile=False, trace_memory=False):
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.phases = {}
+        self.counters = {}
+        self._profiles = {}
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Times the block as the named phase. Repeated phases add up.
+        """
+        phase = self.phases.setdefault(name, {"time": 0.0, "calls": 0})
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+        profile = cProfile.Profile() if self.profile else None
+
+        start = perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            phase["time"] += perf_counter() - start
+            phase["calls"] += 1
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                phase["peak_memory"] = max(phase.get("peak_memory", 0), peak)
+                if started_tracing:
+                    tracemalloc.stop()
+            if profile is not None:
+                if name in self._profiles:
+                    self._profiles[name].add(profile)
+                else:
+                    self._profiles[name] = pstats.Stats(profile)
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def maximum(self, name, value):
+        self.counters[name] = max(self.counters.get(name, value), value)
+
+    def profile_rows(self, name, limit=PROFILE_LIMIT):
+        """
+        The most expensive functions of a profiled phase as dicts, by
+        cumulative time.
+        """
+        if name not in self._profiles:
+            return []
+        rows = []
+        for (file, line, function), timing in self._profiles[name].stats.items():
+            _, calls, total, cumulative, _ = timing
+            rows.append(
+                {
+                    "function": f"{file}:{line}({function})",
+                    "calls": calls,
+                    "total_time": total,
+                    "cumulative_time": cumulative,
+                }
+            )
+        rows.sort(key=lambda row: row["cumulative_time"], reverse=True)
+        return rows[:limit]
+
+    def to_dict(self):
+        phases = {}
+        for name, phase in self.phases.items():
+            phases[name] = dict(phase)
+            if name in self._profiles:
+                phases[name]["profile"] = self.profile_rows(name)
+        return {"phases": phases, "counters": dict(self.counters)}
+
+
+def peak_memory(call, *args, **kwargs):
+    """
+    Peak bytes traced by tracemalloc while running call(*args, **kwargs),
+    such as a whole Maze.solve. Run it as a pass of its own, since tracing
+    slows the call down.
+    """
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        call(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
@@ -1,6 +1,38 @@
 import unittest
-from maze import Maze
+from maze import Maze, MazeWorker, SolveMethod, GenerateMethod
+from generators import (
+    UnionFind,
+    carve_backtracker,
+    carve_binary_tree,
+    carve_kruskal,
+    carve_sidewinder,
+    carve_wilson,
+    eller_rows,
+    write_eller,
+)
+from grid import Grid, TOP, BOTTOM, LEFT, RIGHT, ALL_WALLS
+import io
 import random
+from collections import deque
+from time import perf_counter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def count_open_edges(grid):
+    """
+    Counts the passages between cells, each shared wall counted once.
+    """
+    edges = 0
+    for index in range(len(grid)):
+        for wall in (BOTTOM, RIGHT):
+            other = grid.neighbour(index, wall)
+            if other != -1 and not grid.walls[index] & wall:
+                edges += 1
+    return edges
 
 
 class MazeTest(unittest.TestCase):
@@ -57,6 +89,1085 @@ class MazeTest(unittest.TestCase):
             for j in range(num_cols):
                 self.assertEqual(maze._cells[i][j]._visited, False)
 
+    def test_maze_break_walls_is_perfect(self):
+        num_rows, num_cols = 20, 15
+
+        maze = Maze(0, 0, num_rows, num_cols, 10, 10, None, 10)
+        maze._break_entrance_and_exit()
+        maze._break_walls_iteratively(0, 0)
+
+        # a spanning tree over every cell has exactly cells - 1 passages
+        self.assertEqual(count_open_edges(maze._grid), num_rows * num_cols - 1)
+        self.assertTrue(all(maze._grid.visited))
+
+    def test_drawing_is_queued_as_events(self):
+        maze = Maze(0, 0, 8, 8, 10, 10, object(), 3)
+
+        maze.generate()
+        maze.solve(SolveMethod.BFS.value)
+
+        events = []
+        while not maze.draw_events.empty():
+            events.append(maze.draw_events.get_nowait())
+        names = [name for name, _ in events]
+        self.assertEqual(names[0], "clear_screen")
+        self.assertIn("draw_wall", names)
+        self.assertIn("draw_move", names)
+        self.assertEqual(names[-1], "draw_path")
+
+    def test_one_shot_generators_skip_cell_draws(self):
+        maze = Maze(0, 0, 8, 8, 10, 10, object(), 3)
+        maze.carve_workers = 1
+
+        maze.generate(GenerateMethod.TILED.value)
+
+        names = []
+        while not maze.draw_events.empty():
+            names.append(maze.draw_events.get_nowait()[0])
+        # the whole maze is drawn once, nothing is queued cell by cell first
+        self.assertNotIn("draw_wall", names)
+        self.assertEqual(names[-1], "draw_maze")
+
+
+class MazeWorkerTest(unittest.TestCase):
+    def test_worker_finishes_run(self):
+        maze = Maze(0, 0, 6, 6, 10, 10, object(), 3)
+        worker = MazeWorker(maze)
+
+        worker.start(maze.run, SolveMethod.BFS.value, 6, 6)
+        worker._thread.join(5)
+
+        self.assertFalse(worker.busy())
+        self.assertFalse(maze.draw_events.empty())
+        self.assertTrue(maze.solve(SolveMethod.BFS.value, headless=True).found)
+
+    def test_worker_cancel_stops_blocked_run(self):
+        maze = Maze(0, 0, 100, 100, 10, 10, object(), 3)
+        worker = MazeWorker(maze)
+
+        # nothing plays the events back, so the run fills the queue and waits
+        worker.start(maze.run, SolveMethod.BFS.value, 100, 100)
+        while not maze.draw_events.full():
+            worker._thread.join(0.01)
+        worker.cancel()
+        worker.join(5)
+
+        self.assertFalse(worker.busy())
+        self.assertFalse(maze.draw_state)
+        self.assertFalse(maze.draw_cancelled.is_set())
+
+    def test_cancel_stops_run_without_draw_calls(self):
+        maze = Maze(0, 0, 400, 400, 1, 1, object(), 3)
+        maze.set_render_mode(True)
+        worker = MazeWorker(maze)
+
+        # raster mode carves without a single draw call
+        worker.start(
+            maze.run, SolveMethod.BFS.value, 400, 400, GenerateMethod.WILSON.value
+        )
+        worker._thread.join(0.2)
+        start = perf_counter()
+        worker.cancel()
+        self.assertLess(perf_counter() - start, 0.1)
+        worker.join(5)
+
+        self.assertFalse(worker.busy())
+        self.assertFalse(maze.draw_cancelled.is_set())
+
+    def test_carvers_call_check_cancelled(self):
+        class Stop(Exception):
+            pass
+
+        def check_cancelled():
+            raise Stop()
+
+        for carve in (carve_kruskal, carve_wilson):
+            with self.assertRaises(Stop):
+                carve(Grid(100, 100), random.Random(1), None, check_cancelled)
+        with self.assertRaises(Stop):
+            carve_backtracker(
+                Grid(100, 100), 0, random.Random(1), None, check_cancelled
+            )
+
+
+class GridTest(unittest.TestCase):
+    def test_grid_starts_with_all_walls(self):
+        grid = Grid(3, 4)
+
+        self.assertEqual(len(grid), 12)
+        self.assertTrue(all(mask == ALL_WALLS for mask in grid.walls))
+        self.assertFalse(any(grid.visited))
+
+    def test_grid_carve_removes_both_sides(self):
+        grid = Grid(3, 4)
+        index = grid.index(1, 1)
+
+        grid.carve(index, BOTTOM)
+        grid.carve(index, LEFT)
+
+        self.assertFalse(grid.has_wall(index, BOTTOM))
+        self.assertFalse(grid.has_wall(grid.index(1, 2), TOP))
+        self.assertFalse(grid.has_wall(index, LEFT))
+        self.assertFalse(grid.has_wall(grid.index(0, 1), RIGHT))
+        self.assertTrue(grid.has_wall(index, TOP))
+
+    def test_grid_neighbour_outside(self):
+        grid = Grid(3, 4)
+
+        self.assertEqual(grid.neighbour(0, TOP), -1)
+        self.assertEqual(grid.neighbour(0, LEFT), -1)
+        self.assertEqual(grid.neighbour(len(grid) - 1, BOTTOM), -1)
+        self.assertEqual(grid.neighbour(len(grid) - 1, RIGHT), -1)
+        self.assertEqual(grid.neighbour(0, RIGHT), 4)
+
+    def test_cell_view_writes_through(self):
+        maze = Maze(0, 0, 3, 4, 10, 10)
+
+        maze._cells[1][2].has_left_wall = False
+        maze._cells[2][3]._visited = True
+
+        self.assertFalse(maze._grid.has_wall(maze._grid.index(1, 2), LEFT))
+        self.assertEqual(maze._grid.visited[maze._grid.index(2, 3)], 1)
+        self.assertEqual(maze._cells[1][2], maze._cells[1][2])
+        self.assertNotEqual(maze._cells[1][2], maze._cells[2][1])
+
+    def test_open_masks_need_both_sides(self):
+        from grid import _OpenMaskView
+
+        rng = random.Random(5)
+        for rows, cols in ((1, 1), (1, 6), (6, 1), (7, 9)):
+            walls = bytearray(rng.randrange(16) for _ in range(rows * cols))
+            grid = Grid(rows, cols, walls=walls)
+            view = _OpenMaskView(grid)
+            self.assertEqual(
+                list(grid.open_masks()), [view[index] for index in range(len(grid))]
+            )
+
+        grid = Grid(2, 2)
+        grid.walls[0] &= ~BOTTOM
+        self.assertEqual(grid.open_masks()[0], 0)
+        grid.carve(0, BOTTOM)
+        grid.set_wall(0, TOP, False)
+        self.assertEqual(grid.open_masks()[0], BOTTOM)
+        self.assertEqual(grid.open_masks()[1], TOP)
+
+
+class MazeSolveTest(unittest.TestCase):
+    def build_maze(self, num_rows=25, num_cols=18, seed=7):
+        maze = Maze(0, 0, num_rows, num_cols, 10, 10, None, seed)
+        maze.generate()
+        return maze
+
+    def assert_valid_path(self, maze, path):
+        self.assertEqual(path[0], (0, 0))
+        self.assertEqual(path[-1], (maze._num_rows - 1, maze._num_cols - 1))
+        for (i, j), (next_i, next_j) in zip(path, path[1:]):
+            self.assertEqual(abs(i - next_i) + abs(j - next_j), 1)
+
+    def test_junction_graph_finds_shortest_path(self):
+        for method in (GenerateMethod.BACKTRACKER, GenerateMethod.KRUSKAL):
+            maze = Maze(0, 0, 31, 23, 10, 10, None, 9)
+            maze.generate(method.value)
+            bfs = maze.solve(SolveMethod.BFS.value, headless=True)
+
+            result = maze.solve(SolveMethod.JUNCTION.value, headless=True)
+
+            self.assertEqual(result.path, bfs.path)
+            self.assertLess(result.nodes_expanded, bfs.nodes_expanded)
+            graph = maze._junctions
+            self.assertLess(len(graph), len(maze._grid))
+            # every cell is a node or lies on exactly one corridor
+            self.assertEqual(sum(graph.weights) // 2 + 1, len(maze._grid))
+
+        maze.invalidate_adjacency()
+        self.assertIsNone(maze._junctions)
+        maze.solve(SolveMethod.JUNCTION.value, headless=True)
+        self.assertIsNot(maze._junctions, graph)
+
+    def test_adjacency_follows_wall_changes(self):
+        maze = self.build_maze(6, 6)
+        path = maze.solve(SolveMethod.BFS.value, headless=True).path
+        (i, j), (next_i, next_j) = path[1], path[2]
+        wall = {(0, 1): BOTTOM, (0, -1): TOP, (1, 0): RIGHT, (-1, 0): LEFT}[
+            (next_i - i, next_j - j)
+        ]
+
+        # closing a passage on the only path of a perfect maze cuts it
+        maze._grid.set_wall(maze._grid.index(i, j), wall, True)
+
+        for method in (
+            SolveMethod.DFS,
+            SolveMethod.BFS,
+            SolveMethod.ASTAR,
+            SolveMethod.JUNCTION,
+        ):
+            self.assertFalse(maze.solve(method.value, headless=True).found)
+
+    def test_headless_solve_returns_result(self):
+        maze = self.build_maze()
+
+        for method in SolveMethod:
+            if method == SolveMethod.DEADEND_FILL and numpy is None:
+                continue
+            result = maze.solve(method.value, headless=True)
+            self.assertTrue(result.found)
+            self.assert_valid_path(maze, result.path)
+            # the junction graph expands junctions, not cells
+            if method != SolveMethod.JUNCTION:
+                self.assertGreaterEqual(result.nodes_expanded, len(result.path))
+            self.assertGreater(result.peak_frontier, 0)
+            self.assertGreaterEqual(result.elapsed, 0)
+
+    def test_solvers_agree_on_perfect_maze(self):
+        maze = self.build_maze()
+
+        methods = [
+            method
+            for method in SolveMethod
+            if method != SolveMethod.DEADEND_FILL or numpy is not None
+        ]
+        paths = [maze.solve(method.value, headless=True).path for method in methods]
+        for path in paths[1:]:
+            self.assertEqual(path, paths[0])
+
+    def test_astar_matches_bfs_length_on_braided_maze(self):
+        from stats import RunStats
+
+        maze = self.build_maze(30, 30, seed=3)
+        # open extra walls so there is more than one route to the exit
+        rng = random.Random(5)
+        for _ in range(150):
+            index = rng.randrange(len(maze._grid))
+            wall = rng.choice((BOTTOM, RIGHT))
+            if maze._grid.neighbour(index, wall) != -1:
+                maze._grid.carve(index, wall)
+
+        bfs = maze.solve(SolveMethod.BFS.value, headless=True)
+        astar = maze.solve(SolveMethod.ASTAR.value, headless=True)
+        weighted = maze.solve(SolveMethod.WEIGHTED_ASTAR.value, headless=True)
+        greedy = maze.solve(SolveMethod.GREEDY.value, headless=True)
+
+        bibfs = maze.solve(SolveMethod.BIBFS.value, headless=True)
+        stats = RunStats()
+        junction = maze.solve(SolveMethod.JUNCTION.value, headless=True, stats=stats)
+
+        self.assertEqual(len(astar.path), len(bfs.path))
+        self.assertEqual(len(junction.path), len(bfs.path))
+        # loops leave stale heap entries behind, for cells and junctions alike
+        self.assertGreater(astar.stale_pops, 0)
+        self.assertGreater(junction.stale_pops, 0)
+        self.assertEqual(stats.counters["stale_pops"], junction.stale_pops)
+        self.assertEqual(len(bibfs.path), len(bfs.path))
+        self.assert_valid_path(maze, bibfs.path)
+        self.assertLessEqual(astar.nodes_expanded, bfs.nodes_expanded)
+        self.assert_valid_path(maze, weighted.path)
+        self.assert_valid_path(maze, greedy.path)
+
+    def test_bibfs_expands_fewer_cells(self):
+        maze = Maze(0, 0, 60, 60, 10, 10, None, 11)
+        maze.generate(GenerateMethod.ELLER.value)
+
+        bfs = maze.solve(SolveMethod.BFS.value, headless=True)
+        bibfs = maze.solve(SolveMethod.BIBFS.value, headless=True)
+
+        self.assertEqual(bibfs.path, bfs.path)
+        self.assertLess(bibfs.nodes_expanded, bfs.nodes_expanded)
+
+    def bfs_path_length(self, maze, start, goal):
+        grid = maze._grid
+        steps = {grid.index(*start): 0}
+        queue = deque([grid.index(*start)])
+        while queue:
+            index = queue.popleft()
+            for wall in (TOP, BOTTOM, LEFT, RIGHT):
+                other = grid.neighbour(index, wall)
+                if other != -1 and not grid.walls[index] & wall and other not in steps:
+                    steps[other] = steps[index] + 1
+                    queue.append(other)
+        return steps.get(grid.index(*goal), -1)
+
+    def test_tree_index_answers_any_pair(self):
+        maze = self.build_maze(27, 21, seed=4)
+        rng = random.Random(8)
+
+        corner = (maze._num_rows - 1, maze._num_cols - 1)
+        bfs = maze.solve(SolveMethod.BFS.value, headless=True)
+        self.assertEqual(maze.path_between((0, 0), corner), bfs.path)
+        for _ in range(40):
+            start = (rng.randrange(27), rng.randrange(21))
+            goal = (rng.randrange(27), rng.randrange(21))
+            distance = maze.distance_between(start, goal)
+            path = maze.path_between(start, goal)
+
+            self.assertEqual(distance, self.bfs_path_length(maze, start, goal))
+            self.assertEqual(len(path), distance + 1)
+            self.assertEqual((path[0], path[-1]), (start, goal))
+            for (i, j), (next_i, next_j) in zip(path, path[1:]):
+                self.assertEqual(abs(i - next_i) + abs(j - next_j), 1)
+
+    def test_tree_index_caches_paths(self):
+        maze = self.build_maze()
+        tree = maze.tree_index()
+
+        path = maze.path_between((3, 2), (20, 11))
+        self.assertEqual(maze.path_between((3, 2), (20, 11)), path)
+        self.assertEqual(maze.path_between((20, 11), (3, 2)), path[::-1])
+        self.assertEqual((tree.hits, tree.misses), (2, 1))
+
+        tree.cache_size = 2
+        maze.path_between((0, 0), (1, 1))
+        self.assertEqual(len(tree._paths), 2)
+        grid = maze._grid
+        self.assertNotIn((grid.index(3, 2), grid.index(20, 11)), tree._paths)
+
+    def test_tree_index_rebuilds_and_rejects_loops(self):
+        maze = Maze(0, 0, 4, 4, 10, 10)
+        self.assertEqual(maze.distance_between((0, 0), (3, 3)), -1)
+        self.assertEqual(maze.path_between((0, 0), (3, 3)), [])
+
+        maze.generate()
+        self.assertEqual(maze.distance_between((0, 0), (0, 0)), 0)
+        for index in range(len(maze._grid)):
+            for wall in (BOTTOM, RIGHT):
+                if maze._grid.neighbour(index, wall) != -1:
+                    maze._grid.carve(index, wall)
+        with self.assertRaises(ValueError):
+            maze.tree_index()
+
+
+class GeneratorTest(unittest.TestCase):
+    def assert_perfect(self, grid):
+        self.assertEqual(count_open_edges(grid), len(grid) - 1)
+        # a connected graph with cells - 1 edges is a spanning tree
+        seen = {0}
+        stack = [0]
+        while stack:
+            index = stack.pop()
+            for wall in (TOP, BOTTOM, LEFT, RIGHT):
+                other = grid.neighbour(index, wall)
+                if other != -1 and not grid.walls[index] & wall and other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+        self.assertEqual(len(seen), len(grid))
+
+    def test_eller_rows_build_perfect_maze(self):
+        rows = list(eller_rows(23, 17, random.Random(1)))
+
+        self.assertEqual(len(rows), 23)
+        self.assertTrue(all(len(row) == 17 for row in rows))
+        self.assert_perfect(Grid(23, 17, walls=bytearray().join(rows)))
+
+    def test_eller_single_row_and_column(self):
+        self.assert_perfect(Grid(1, 9, walls=bytearray().join(eller_rows(1, 9))))
+        self.assert_perfect(Grid(9, 1, walls=bytearray().join(eller_rows(9, 1))))
+
+    def test_write_eller_streams_to_file(self):
+        file = io.BytesIO()
+
+        write_eller(file, 12, 8, random.Random(3))
+
+        walls = bytearray(file.getvalue())
+        self.assertEqual(len(walls), 96)
+        self.assertFalse(walls[0] & TOP)
+        self.assertFalse(walls[-1] & BOTTOM)
+        walls[0] |= TOP
+        walls[-1] |= BOTTOM
+        self.assert_perfect(Grid(12, 8, walls=walls))
+
+    def test_backtracker_is_perfect_and_seeded(self):
+        first = Maze(0, 0, 40, 25, 10, 10, None, 21)
+        second = Maze(0, 0, 40, 25, 10, 10, None, 21)
+        first.generate()
+        second.generate()
+
+        self.assertEqual(first._grid.walls, second._grid.walls)
+        first._grid.set_wall(0, TOP, True)
+        first._grid.set_wall(len(first._grid) - 1, BOTTOM, True)
+        self.assert_perfect(first._grid)
+
+    def test_backtracker_large_maze_without_recursion(self):
+        grid = Grid(300, 300)
+
+        carve_backtracker(grid, 0, random.Random(2))
+
+        self.assert_perfect(grid)
+
+    def test_union_find(self):
+        sets = UnionFind(6)
+
+        self.assertTrue(sets.union(0, 1))
+        self.assertTrue(sets.union(2, 3))
+        self.assertTrue(sets.union(1, 3))
+        self.assertFalse(sets.union(0, 2))
+        self.assertEqual(sets.find(0), sets.find(3))
+        self.assertNotEqual(sets.find(0), sets.find(4))
+
+    def test_kruskal_and_wilson_are_perfect(self):
+        for carve in (carve_kruskal, carve_wilson):
+            grid = Grid(31, 19)
+            carved = []
+
+            carve(grid, random.Random(8), lambda a, b: carved.append((a, b)))
+
+            self.assert_perfect(grid)
+            self.assertEqual(len(carved), len(grid) - 1)
+
+    def test_tiled_maze_is_perfect_for_any_worker_count(self):
+        from tiling import carve_tiled
+
+        grids = []
+        for workers in (1, 2, 3):
+            grid = Grid(37, 29)
+            carved = carve_tiled(grid, 12345, tile_size=8, workers=workers)
+            self.assertEqual(carved, len(grid) - 1)
+            self.assert_perfect(grid)
+            grids.append(bytes(grid.walls))
+
+        self.assertEqual(grids[1], grids[0])
+        self.assertEqual(grids[2], grids[0])
+        other = Grid(37, 29)
+        carve_tiled(other, 54321, tile_size=8, workers=1)
+        self.assertNotEqual(bytes(other.walls), grids[0])
+
+    def test_tiled_generate_method(self):
+        mazes = []
+        for workers in (1, 2):
+            maze = Maze(0, 0, 30, 20, 10, 10, None, 5)
+            maze.carve_tile_size = 7
+            maze.carve_workers = workers
+            maze.generate(GenerateMethod.TILED.value)
+            mazes.append(bytes(maze._grid.walls))
+
+        self.assertEqual(mazes[0], mazes[1])
+        self.assertTrue(maze.solve(SolveMethod.BFS.value, headless=True).found)
+
+    def test_vectorized_generators_are_perfect_and_seeded(self):
+        for carve in (carve_binary_tree, carve_sidewinder):
+            for num_rows, num_cols in ((27, 33), (1, 12), (12, 1)):
+                grid = Grid(num_rows, num_cols)
+                again = Grid(num_rows, num_cols)
+
+                carve(grid, 42)
+                carve(again, 42)
+
+                self.assert_perfect(grid)
+                self.assertEqual(grid.walls, again.walls)
+
+    def test_maze_generate_methods_are_solvable(self):
+        methods = list(GenerateMethod)
+        if numpy is None:
+            methods.remove(GenerateMethod.BINARY_TREE)
+            methods.remove(GenerateMethod.SIDEWINDER)
+        for method in methods:
+            maze = Maze(0, 0, 25, 20, 10, 10, None, 6)
+            maze.generate(method.value)
+
+            self.assertFalse(maze._cells[0][0].has_top_wall)
+            self.assertFalse(maze._cells[24][19].has_bottom_wall)
+            self.assertTrue(maze.solve(SolveMethod.BFS.value, headless=True).found)
+
+    def test_maze_generate_eller(self):
+        maze = Maze(0, 0, 20, 30, 10, 10, None, 5)
+        maze.generate(GenerateMethod.ELLER.value)
+
+        self.assertFalse(maze._cells[0][0].has_top_wall)
+        self.assertFalse(maze._cells[19][29].has_bottom_wall)
+        result = maze.solve(SolveMethod.BFS.value, headless=True)
+        self.assertTrue(result.found)
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class WavefrontTest(unittest.TestCase):
+    def bfs_distances(self, grid):
+        distances = [-1] * len(grid)
+        distances[0] = 0
+        queue = deque([0])
+        while queue:
+            index = queue.popleft()
+            for wall in (TOP, BOTTOM, LEFT, RIGHT):
+                other = grid.neighbour(index, wall)
+                if other != -1 and not grid.walls[index] & wall and distances[other] == -1:
+                    distances[other] = distances[index] + 1
+                    queue.append(other)
+        return distances
+
+    def test_distance_field_matches_bfs(self):
+        maze = Maze(0, 0, 40, 35, 10, 10, None, 4)
+        maze.generate()
+        rng = random.Random(2)
+        for _ in range(100):
+            index = rng.randrange(len(maze._grid))
+            wall = rng.choice((BOTTOM, RIGHT))
+            if maze._grid.neighbour(index, wall) != -1:
+                maze._grid.carve(index, wall)
+
+        distances, path = maze.distance_field()
+
+        self.assertEqual(distances.dtype, numpy.int32)
+        self.assertEqual(distances.shape, (40, 35))
+        self.assertEqual(distances.ravel().tolist(), self.bfs_distances(maze._grid))
+        bfs = maze.solve(SolveMethod.BFS.value, headless=True)
+        self.assertEqual(path, bfs.path)
+
+    def test_distance_field_array_sweeps_match_bfs(self):
+        import wavefront
+
+        # sweep every level with arrays, however narrow the frontier
+        self.addCleanup(setattr, wavefront, "SWEEP_BATCH", wavefront.SWEEP_BATCH)
+        wavefront.SWEEP_BATCH = 1
+        for seed in range(5):
+            maze = Maze(0, 0, 30, 30, 10, 10, None, seed)
+            maze.generate()
+            rng = random.Random(seed)
+            for _ in range(150):
+                index = rng.randrange(len(maze._grid))
+                wall = rng.choice((BOTTOM, RIGHT))
+                if maze._grid.neighbour(index, wall) != -1:
+                    maze._grid.carve(index, wall)
+
+            distances, path = maze.distance_field()
+
+            bfs = maze.solve(SolveMethod.BFS.value, headless=True)
+            self.assertEqual(path, bfs.path)
+            self.assertEqual(distances.ravel().tolist(), self.bfs_distances(maze._grid))
+
+    def test_distance_field_path_on_perfect_maze(self):
+        maze = Maze(0, 0, 30, 30, 10, 10, None, 9)
+        maze.generate()
+
+        _, path = maze.distance_field()
+
+        self.assertEqual(path, maze.solve(SolveMethod.BFS.value, headless=True).path)
+
+    def test_distance_field_unreachable(self):
+        maze = Maze(0, 0, 4, 4, 10, 10)
+
+        distances, path = maze.distance_field()
+
+        self.assertEqual(path, [])
+        self.assertEqual(int(distances[0, 0]), 0)
+        self.assertEqual(int((distances == -1).sum()), 15)
+
+    def test_dead_end_fill_matches_bfs(self):
+        for method in GenerateMethod:
+            maze = Maze(0, 0, 45, 40, 10, 10, None, 6)
+            maze.generate(method.value)
+
+            result = maze.solve(SolveMethod.DEADEND_FILL.value, headless=True)
+
+            bfs = maze.solve(SolveMethod.BFS.value, headless=True)
+            self.assertEqual(result.path, bfs.path)
+            # every cell off the path is filled in a perfect maze
+            self.assertEqual(result.nodes_expanded, len(maze._grid))
+
+    def test_dead_end_fill_gives_up_on_loops(self):
+        from wavefront import dead_end_fill
+
+        # open every wall, nothing is a dead end and no single corridor is left
+        maze = Maze(0, 0, 5, 5, 10, 10)
+        for index in range(len(maze._grid)):
+            for wall in (BOTTOM, RIGHT):
+                if maze._grid.neighbour(index, wall) != -1:
+                    maze._grid.carve(index, wall)
+
+        path, filled, _ = dead_end_fill(maze._grid)
+
+        self.assertEqual(path, [])
+        self.assertEqual(filled, 0)
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class RasterTest(unittest.TestCase):
+    def test_render_at_lattice_size(self):
+        from raster import RasterLayout
+
+        maze = Maze(0, 0, 6, 4, 10, 10, None, 3)
+        maze.generate()
+        layout = RasterLayout(6, 4, 13, 9)
+
+        pixels = layout.render(maze._grid.wall_array())
+
+        self.assertEqual(pixels.shape, (9, 13, 3))
+        is_open = pixels[:, :, 0] == 255
+        for i in range(6):
+            for j in range(4):
+                index = maze._grid.index(i, j)
+                self.assertTrue(is_open[2 * j + 1, 2 * i + 1])
+                self.assertEqual(
+                    is_open[2 * j + 2, 2 * i + 1],
+                    not maze._grid.walls[index] & BOTTOM,
+                )
+                self.assertEqual(
+                    is_open[2 * j + 1, 2 * i + 2],
+                    not maze._grid.walls[index] & RIGHT,
+                )
+        # entrance and corners
+        self.assertTrue(is_open[0, 1])
+        self.assertFalse(is_open[0, 0])
+
+    def test_render_cost_follows_pixels(self):
+        from raster import RasterLayout, to_ppm
+
+        maze = Maze(0, 0, 500, 400, 10, 10, None, 3)
+        maze.generate(GenerateMethod.ELLER.value)
+        layout = RasterLayout(500, 400, 64, 48)
+
+        pixels = layout.render(maze._grid.wall_array())
+
+        self.assertEqual(pixels.shape, (48, 64, 3))
+        self.assertTrue(to_ppm(pixels).startswith(b"P6 64 48 255\n"))
+        x1, y1, x2, y2 = layout.cells_rectangle((499, 399), (498, 399))
+        self.assertTrue(0 <= x1 < x2 <= 64 and 0 <= y1 < y2 <= 48)
+
+
+class RunStatsTest(unittest.TestCase):
+    def test_counts_phases_and_search(self):
+        from stats import RunStats
+
+        stats = RunStats(profile=True, trace_memory=True)
+        maze = Maze(0, 0, 30, 20, 10, 10, None, 2)
+        maze.generate(GenerateMethod.KRUSKAL.value, stats)
+        bfs = maze.solve(SolveMethod.BFS.value, headless=True, stats=stats)
+        greedy = maze.solve(SolveMethod.GREEDY.value, headless=True, stats=stats)
+
+        data = stats.to_dict()
+        phases = data["phases"]
+        counters = data["counters"]
+        for name in ("create_cells", "entrance_and_exit", "carve", "solve"):
+            self.assertIn(name, phases)
+            self.assertGreater(phases[name]["peak_memory"], 0)
+        self.assertEqual(phases["solve"]["calls"], 2)
+        self.assertTrue(phases["carve"]["profile"])
+        self.assertEqual(counters["cells_carved"], 30 * 20 - 1)
+        self.assertEqual(
+            counters["nodes_expanded"], bfs.nodes_expanded + greedy.nodes_expanded
+        )
+        self.assertEqual(
+            counters["frontier_peak"], max(bfs.peak_frontier, greedy.peak_frontier)
+        )
+        self.assertGreaterEqual(bfs.discovered, len(bfs.path) - 1)
+
+    def test_every_generator_counts_a_spanning_tree(self):
+        from stats import RunStats
+
+        for method in GenerateMethod:
+            if numpy is None and method in (
+                GenerateMethod.BINARY_TREE,
+                GenerateMethod.SIDEWINDER,
+            ):
+                continue
+            stats = RunStats()
+            Maze(0, 0, 9, 13, 10, 10, None, 4).generate(method.value, stats)
+            self.assertEqual(stats.counters["cells_carved"], 9 * 13 - 1, method)
+
+
+class MazeFileTest(unittest.TestCase):
+    def setUp(self):
+        import os
+        import tempfile
+
+        handle, self.path = tempfile.mkstemp(suffix=".maze")
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def test_pack_round_trip(self):
+        from mazefile import PackedWalls, pack, unpack
+
+        cells = bytearray(random.Random(1).randrange(16) for _ in range(101))
+        packed = bytearray(pack(cells))
+        walls = PackedWalls(packed, len(cells))
+
+        self.assertEqual(len(packed), 51)
+        self.assertEqual(unpack(packed, len(cells)), cells)
+        self.assertEqual([walls[index] for index in range(101)], list(cells))
+        walls[100] = 9
+        walls[99] = 6
+        self.assertEqual((walls[99], walls[100], walls[98]), (6, 9, cells[98]))
+
+    def test_save_and_load(self):
+        maze = Maze(0, 0, 23, 17, 10, 10, None, 8)
+        maze.generate(GenerateMethod.KRUSKAL.value)
+        result = maze.solve(SolveMethod.BFS.value, headless=True)
+        maze.save(self.path, result.path)
+
+        loaded = Maze.load(self.path)
+        self.addCleanup(loaded.close)
+
+        self.assertEqual((loaded._num_rows, loaded._num_cols), (23, 17))
+        self.assertEqual(loaded.seed, 8)
+        self.assertEqual(loaded.generate_method, GenerateMethod.KRUSKAL.value)
+        # loading maps the walls and allocates nothing per cell until a solve
+        self.assertIsNone(loaded._grid._visited)
+        self.assertEqual(bytes(loaded._grid.walls.unpack()), bytes(maze._grid.walls))
+        self.assertEqual(loaded.saved_solution(), result.path)
+        for method in SolveMethod:
+            if method == SolveMethod.DEADEND_FILL and numpy is None:
+                continue
+            self.assertEqual(
+                loaded.solve(method.value, headless=True).path,
+                maze.solve(method.value, headless=True).path,
+            )
+
+    def test_packed_walls_slices(self):
+        from mazefile import PackedWalls, pack
+
+        cells = bytearray(random.Random(2).randrange(16) for _ in range(101))
+        walls = PackedWalls(bytearray(pack(cells)), len(cells))
+
+        for start, stop in ((0, 101), (3, 50), (4, 9), (7, 8), (100, 101), (5, 5)):
+            self.assertEqual(walls[start:stop], cells[start:stop])
+        replacement = bytearray(random.Random(3).randrange(16) for _ in range(40))
+        walls[13:53] = replacement
+        cells[13:53] = replacement
+        self.assertEqual(walls.unpack(), cells)
+        with self.assertRaises(ValueError):
+            walls[0:4] = b"\0"
+
+    def test_load_and_save_again(self):
+        import os
+        import tempfile
+
+        maze = Maze(0, 0, 19, 21, 10, 10, None, 4)
+        maze.generate(GenerateMethod.WILSON.value)
+        maze.save(self.path)
+        loaded = Maze.load(self.path)
+        self.addCleanup(loaded.close)
+
+        handle, copy = tempfile.mkstemp(suffix=".maze")
+        os.close(handle)
+        self.addCleanup(os.remove, copy)
+        loaded.save(copy)
+        with open(self.path, "rb") as first, open(copy, "rb") as second:
+            self.assertEqual(first.read(), second.read())
+
+    @unittest.skipIf(numpy is None, "needs NumPy")
+    def test_numpy_carvers_write_to_loaded_file(self):
+        Maze(0, 0, 15, 13, 10, 10, None, 1).save(self.path)
+        loaded = Maze.load(self.path, writable=True)
+        self.addCleanup(loaded.close)
+        carve_binary_tree(loaded._grid, 6)
+
+        expected = Grid(15, 13)
+        carve_binary_tree(expected, 6)
+        self.assertEqual(loaded._grid.walls.unpack(), expected.walls)
+
+    def test_streamed_eller_matches_generate(self):
+        import mazefile
+        from generators import eller_maze_rows
+
+        with open(self.path, "wb") as file:
+            mazefile.write_rows(
+                file, 9, 7, eller_maze_rows(9, 7, random.Random(4)), 1, 4
+            )
+        maze = Maze(0, 0, 9, 7, 10, 10, None, 4)
+        maze.generate(GenerateMethod.ELLER.value)
+
+        with mazefile.load(self.path) as file:
+            self.assertEqual(file.solution(), [])
+            self.assertEqual(bytes(file.grid().walls.unpack()), bytes(maze._grid.walls))
+
+    def test_rejects_other_files(self):
+        import mazefile
+
+        with open(self.path, "wb") as file:
+            file.write(b"not a maze file at all" * 4)
+
+        with self.assertRaises(mazefile.MazeFileError):
+            mazefile.load(self.path)
+
+
+class TileTest(unittest.TestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_store_evicts_least_recently_used(self):
+        from tiles import TileStore
+
+        store = TileStore(self.directory, 100, "i", -1, tile_size=10, max_resident=2)
+
+        self.assertEqual(store[0], -1)
+        store[15] = 7
+        store[3] = 4
+        store[25] = 9
+        self.assertEqual(len(store._resident), 2)
+        self.assertEqual((store.misses, store.hits, store.evictions), (3, 1, 1))
+        self.assertEqual((store[15], store[3], store[25]), (7, 4, 9))
+
+        store[8:13] = [1, 2, 3, 4, 5]
+        self.assertEqual(list(store[7:14]), [-1, 1, 2, 3, 4, 5, -1])
+        store.reset()
+        self.assertEqual(store[15], -1)
+
+    def test_tiled_tree_index_matches_memory(self):
+        import treeindex
+
+        self.addCleanup(setattr, treeindex, "LEVEL_CHUNK", treeindex.LEVEL_CHUNK)
+        treeindex.LEVEL_CHUNK = 7
+        memory = Maze(0, 0, 40, 30, 10, 10, None, 2)
+        tiled = Maze(0, 0, 40, 30, 10, 10, None, 2)
+        tiled.set_storage(self.directory, tile_size=64, max_resident=3)
+        memory.generate()
+        tiled.generate()
+
+        memory_tree = memory.tree_index()
+        tiled_tree = tiled.tree_index()
+        self.assertEqual(len(tiled_tree.up), len(memory_tree.up))
+        for tiled_level, memory_level in zip(tiled_tree.up, memory_tree.up):
+            self.assertEqual(list(tiled_level[:]), list(memory_level))
+
+    def test_tiled_maze_matches_memory(self):
+        memory = Maze(0, 0, 40, 30, 10, 10, None, 6)
+        tiled = Maze(0, 0, 40, 30, 10, 10, None, 6, storage=self.directory)
+        tiled.set_storage(self.directory, tile_size=64, max_resident=3)
+
+        for method in (GenerateMethod.BACKTRACKER, GenerateMethod.ELLER):
+            memory.generate(method.value)
+            tiled.generate(method.value)
+            self.assertEqual(bytes(tiled._grid.walls[:]), bytes(memory._grid.walls))
+            for solve_method in (SolveMethod.BFS, SolveMethod.ASTAR, SolveMethod.BIBFS):
+                self.assertEqual(
+                    tiled.solve(solve_method.value, headless=True).path,
+                    memory.solve(solve_method.value, headless=True).path,
+                )
+            self.assertEqual(
+                tiled.path_between((3, 4), (35, 20)),
+                memory.path_between((3, 4), (35, 20)),
+            )
+        self.assertLessEqual(len(tiled._grid.walls._resident), 3)
+        self.assertGreater(tiled._grid.misses, 0)
+        self.assertGreater(tiled._grid.hits, tiled._grid.misses)
+
+
+class BenchmarkTest(unittest.TestCase):
+    def test_runs_matrix(self):
+        from benchmarks.bench import run_benchmarks
+
+        results = run_benchmarks(
+            [(8, 8)],
+            [GenerateMethod.BACKTRACKER, GenerateMethod.KRUSKAL],
+            [SolveMethod.BFS, SolveMethod.ASTAR],
+            [1, 2],
+        )
+
+        self.assertEqual(len(results), 8)
+        for result in results:
+            self.assertGreater(result["path_length"], 0)
+            self.assertGreater(result["peak_memory"], 0)
+
+    def test_compare_flags_regressions(self):
+        from benchmarks.bench import compare, run_benchmarks
+
+        baseline = run_benchmarks(
+            [(8, 8)], [GenerateMethod.BACKTRACKER], [SolveMethod.BFS], [1], False
+        )
+        slower = [dict(baseline[0], solve_time=1.0, nodes_expanded=10**6)]
+
+        self.assertEqual(compare(baseline, baseline), [])
+        self.assertEqual(len(compare(slower, baseline)), 2)
+
+    def test_default_matrix_skips_numpy_methods(self):
+        from benchmarks.bench import NUMPY_SOLVERS, default_methods
+
+        without = default_methods(SolveMethod, NUMPY_SOLVERS, False)
+
+        self.assertNotIn(SolveMethod.DEADEND_FILL, without)
+        self.assertEqual(len(without), len(SolveMethod) - 1)
+        self.assertEqual(
+            default_methods(SolveMethod, NUMPY_SOLVERS, True), list(SolveMethod)
+        )
+
+    def test_parallel_run_keeps_order(self):
+        from benchmarks.bench import run_benchmarks
+
+        args = (
+            [(8, 8), (10, 6)],
+            [GenerateMethod.BACKTRACKER],
+            [SolveMethod.BFS, SolveMethod.DFS],
+            [1, 2],
+        )
+        serial = run_benchmarks(*args, memory=False)
+        parallel = run_benchmarks(*args, memory=False, workers=2)
+
+        times = ("generate_time", "solve_time")
+        self.assertEqual(
+            [{k: v for k, v in row.items() if k not in times} for row in parallel],
+            [{k: v for k, v in row.items() if k not in times} for row in serial],
+        )
+
+    def test_parallel_run_measures_memory_like_serial(self):
+        from benchmarks.bench import run_benchmarks
+
+        args = (
+            [(150, 150)],
+            [GenerateMethod.KRUSKAL],
+            [SolveMethod.BFS, SolveMethod.ASTAR],
+            [1],
+        )
+        serial = run_benchmarks(*args)
+        parallel = run_benchmarks(*args, workers=1)
+
+        # the first traced solve of a process also pays for one off setup
+        serial_peak = serial[1]["peak_memory"]
+        self.assertAlmostEqual(
+            parallel[1]["peak_memory"], serial_peak, delta=serial_peak // 50
+        )
+
+
+class BatchTest(unittest.TestCase):
+    def test_results_match_serial_solves(self):
+        from batch import BatchJob, solve_batch
+
+        jobs = [
+            BatchJob(12, 9, seed, method, (SolveMethod.BFS, SolveMethod.ASTAR))
+            for seed in (1, 2)
+            for method in (GenerateMethod.BACKTRACKER, GenerateMethod.KRUSKAL)
+        ]
+
+        results = list(solve_batch(jobs, workers=2, keep_walls=True))
+
+        self.assertEqual(sorted(result.index for result in results), [0, 1, 2, 3])
+        for result in results:
+            job = jobs[result.index]
+            maze = Maze(0, 0, 12, 9, 10, 10, None, job.seed)
+            maze.generate(job.generate_method.value)
+            self.assertEqual(result.walls, bytes(maze._grid.walls))
+            self.assertEqual(result.generator, job.generate_method.name)
+            for solve, method in zip(result.solves, job.solve_methods):
+                expected = maze.solve(method.value, headless=True)
+                self.assertEqual(solve["solver"], method.name)
+                self.assertEqual(solve["path_length"], len(expected.path))
+                self.assertEqual(solve["nodes_expanded"], expected.nodes_expanded)
+
+    def test_solves_given_walls(self):
+        from batch import BatchJob, solve_batch
+
+        maze = Maze(0, 0, 15, 11, 10, 10, None, 3)
+        maze.generate(GenerateMethod.WILSON.value)
+        walls = bytes(maze._grid.walls)
+
+        (result,) = solve_batch([BatchJob(15, 11, walls=walls)], 1, trace_memory=True)
+
+        self.assertIsNone(result.generator)
+        self.assertIsNone(result.walls)
+        solve = result.solves[0]
+        self.assertEqual(
+            solve["path_length"],
+            len(maze.solve(SolveMethod.BFS.value, headless=True).path),
+        )
+        self.assertGreater(solve["peak_memory"], 0)
+
+
+class WindowTest(unittest.TestCase):
+    def setUp(self):
+        try:
+            import window
+        except ImportError:
+            self.skipTest("tkinter is not installed")
+        self.window = window
+
+    def test_numpy_options_hidden_without_numpy(self):
+        window = self.window
+        self.addCleanup(setattr, window, "HAS_NUMPY", window.HAS_NUMPY)
+
+        window.HAS_NUMPY = False
+        generators = window.available(window.GENERATORS, window.NUMPY_GENERATORS)
+        modes = window.available(window.RENDER_MODES, window.NUMPY_RENDER_MODES)
+        self.assertNotIn("Sidewinder", generators)
+        self.assertIn("Tiled (Parallel)", generators)
+        self.assertEqual(modes, ["Vector"])
+
+        window.HAS_NUMPY = True
+        modes = window.available(window.RENDER_MODES, window.NUMPY_RENDER_MODES)
+        self.assertEqual(modes, ["Vector", "Raster"])
+
+    def test_failing_canvas_call_keeps_frames_scheduled(self):
+        AnimationScheduler = self.window.AnimationScheduler
+
+        class Root:
+            def __init__(self):
+                self.scheduled = []
+
+            def after(self, delay, callback):
+                self.scheduled.append(callback)
+                return len(self.scheduled)
+
+        class Canvas:
+            def __init__(self):
+                self.drawn = []
+
+            def draw_wall(self, *args):
+                raise RuntimeError("bad item id")
+
+            def draw_move(self, *args):
+                self.drawn.append(args)
+
+        maze = Maze(0, 0, 4, 4, 10, 10, object(), 1)
+        maze.draw_events.put(("draw_wall", (1,)))
+        maze.draw_events.put(("draw_move", (2,)))
+        root = Root()
+        canvas = Canvas()
+        scheduler = AnimationScheduler(root, canvas, maze)
+
+        with self.assertRaises(RuntimeError):
+            scheduler.frame()
+        self.assertEqual(len(root.scheduled), 2)
+        root.scheduled[-1]()
+        self.assertEqual(canvas.drawn, [(2,)])
+
+
+class CommandLineTest(unittest.TestCase):
+    def test_headless_commands_skip_tkinter(self):
+        import subprocess
+        import sys
+
+        code = (
+            "import sys, main;"
+            "main.main(['solve', '--rows', '5', '--cols', '5', '--seed', '1',"
+            " '--method', 'bfs', '--show']);"
+            "assert 'tkinter' not in sys.modules and 'window' not in sys.modules"
+        )
+        completed = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True
+        )
+
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertIn("Breadth First Search", completed.stdout)
+
+    def test_maze_import_skips_tile_carver(self):
+        import subprocess
+        import sys
+
+        code = (
+            "import sys, maze;"
+            "assert maze.TILE_SIZE > 0;"
+            "assert 'tiling' not in sys.modules;"
+            "assert 'concurrent.futures.process' not in sys.modules"
+        )
+        completed = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True
+        )
+
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+
+    def test_render_text(self):
+        from main import render_text
+
+        maze = Maze(0, 0, 4, 3, 1, 1, None, 2)
+        maze.generate()
+        path = maze.solve(SolveMethod.BFS.value, headless=True).path
+
+        lines = render_text(maze._grid, path).splitlines()
+
+        self.assertEqual(len(lines), 7)
+        self.assertTrue(all(len(line) == 9 for line in lines))
+        self.assertEqual(lines[0][1], " ")
+        self.assertEqual(lines[-1][-2], " ")
+        self.assertEqual(sum(line.count(".") for line in lines), 2 * len(path) - 1)
+
 
 if __name__ == "__main__":
     unittest.main()
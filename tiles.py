@@ -0,0 +1,251 @@
+"""
+Out of core maze storage for grids larger than memory.
+
+A TileStore is a flat array split into fixed size tiles, each one a file in a
+directory that is memory mapped while it is resident. At most max_resident
+tiles are mapped at once and the least recently used one is unmapped to make
+room, so the memory held stays bounded however large the array is.
+
+TiledGrid is a Grid keeping its walls, visited flags and every solver array
+from Grid.allocate in tile stores, so generators and solvers run on it
+unchanged.
+"""
+import mmap
+import os
+import shutil
+import tempfile
+import weakref
+from array import array
+from collections import OrderedDict
+
+from grid import Grid, ALL_WALLS
+
+# cells per tile, 1 MiB of wall masks
+TILE_CELLS = 1 << 20
+# tiles kept mapped per store
+MAX_RESIDENT = 16
+
+
+class TileStore:
+    """
+    Array of length items of an array typecode stored in tile files under
+    directory. Tiles are created on first use filled with fill. hits and
+    misses count accesses that found their tile resident or had to map it.
+    """
+    def __init__(
+        self,
+        directory,
+        length,
+        typecode="B",
+        fill=0,
+        tile_size=TILE_CELLS,
+        max_resident=MAX_RESIDENT,
+    ):
+        self.directory = directory
+        self.length = length
+        self.typecode = typecode
+        self.fill = fill
+        self.tile_size = tile_size
+        self.max_resident = max(1, max_resident)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._resident = OrderedDict()
+        self._last = -1
+        self._last_view = None
+        os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return self.length
+
+    def _path(self, tile):
+        return os.path.join(self.directory, f"tile_{tile:06d}.bin")
+
+    def _tile(self, tile):
+        """
+        Memoryview of a tile, mapping it in and evicting the least recently
+        used tile when it is not resident.
+        """
+        if tile == self._last:
+            self.hits += 1
+            return self._last_view
+
+        view = self._resident.get(tile)
+        if view is not None:
+            self.hits += 1
+            self._resident.move_to_end(tile)
+        else:
+            self.misses += 1
+            if len(self._resident) >= self.max_resident:
+                self._unmap(*self._resident.popitem(last=False))
+                self.evictions += 1
+            view = self._map(tile)
+            self._resident[tile] = view
+
+        self._last = tile
+        self._last_view = view
+        return view
+
+    def _map(self, tile):
+        path = self._path(tile)
+        items = min(self.tile_size, self.length - tile * self.tile_size)
+        if not os.path.exists(path):
+            with open(path, "wb") as file:
+                file.write(array(self.typecode, [self.fill]) * items)
+        with open(path, "r+b") as file:
+            mapped = mmap.mmap(file.fileno(), 0)
+        with memoryview(mapped) as raw:
+            return raw.cast(self.typecode)
+
+    def _unmap(self, tile, view):
+        if tile == self._last:
+            self._last = -1
+            self._last_view = None
+        buffer = view.obj
+        view.release()
+        buffer.close()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._read(*self._range(index))
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("tile store index out of range")
+        return self._tile(index // self.tile_size)[index % self.tile_size]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            start, stop = self._range(index)
+            if len(value) != stop - start:
+                raise ValueError("tile store slices cannot change size")
+            self._write(start, value)
+            return
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("tile store index out of range")
+        self._tile(index // self.tile_size)[index % self.tile_size] = value
+
+    def _range(self, index):
+        start, stop, step = index.indices(self.length)
+        if step != 1:
+            raise ValueError("tile store slices need a step of 1")
+        return start, max(start, stop)
+
+    def _read(self, start, stop):
+        items = array(self.typecode)
+        while start < stop:
+            tile, offset = divmod(start, self.tile_size)
+            end = min(stop - start, self.tile_size - offset) + offset
+            items.frombytes(self._tile(tile)[offset:end].tobytes())
+            start += end - offset
+        return items
+
+    def _write(self, start, values):
+        values = memoryview(array(self.typecode, values))
+        done = 0
+        while done < len(values):
+            tile, offset = divmod(start + done, self.tile_size)
+            count = min(len(values) - done, self.tile_size - offset)
+            self._tile(tile)[offset : offset + count] = values[done : done + count]
+            done += count
+
+    def reset(self):
+        """
+        Sets every item back to fill by dropping the tile files.
+        """
+        self.flush()
+        for tile in range(-(-self.length // self.tile_size)):
+            if os.path.exists(self._path(tile)):
+                os.remove(self._path(tile))
+
+    def flush(self):
+        """
+        Unmaps every resident tile, writing changes back to the tile files.
+        """
+        while self._resident:
+            self._unmap(*self._resident.popitem())
+
+    def close(self):
+        self.flush()
+
+
+class TiledGrid(Grid):
+    """
+    Grid whose walls, visited flags and allocated arrays live in tile stores
+    under directory. Arrays handed out by allocate are temporary and their
+    files are removed once the array is garbage collected.
+    """
+    def __init__(
+        self,
+        num_rows,
+        num_cols,
+        directory,
+        tile_size=TILE_CELLS,
+        max_resident=MAX_RESIDENT,
+    ):
+        self.directory = directory
+        self.tile_size = tile_size
+        self.max_resident = max_resident
+        size = num_rows * num_cols
+        walls = self._store("walls", size, "B", ALL_WALLS)
+        visited = self._store("visited", size, "B", 0)
+        walls.reset()
+        visited.reset()
+        super().__init__(num_rows, num_cols, walls, visited)
+
+    def _store(self, name, size, typecode, fill):
+        return TileStore(
+            os.path.join(self.directory, name),
+            size,
+            typecode,
+            fill,
+            self.tile_size,
+            self.max_resident,
+        )
+
+    def allocate(self, typecode, fill=0):
+        directory = tempfile.mkdtemp(prefix="array_", dir=self.directory)
+        store = TileStore(
+            directory, len(self), typecode, fill, self.tile_size, self.max_resident
+        )
+        weakref.finalize(store, _remove_store, store._resident, directory)
+        return store
+
+    def reset_visited(self):
+        self.visited.reset()
+
+    def wall_array(self):
+        """
+        Copy of the wall masks as a (num_rows, num_cols) NumPy uint8 array,
+        which only makes sense for grids that fit in memory.
+        """
+        import numpy as np
+
+        return np.frombuffer(self.walls[:], dtype=np.uint8).reshape(
+            self.num_rows, self.num_cols
+        )
+
+    def store_wall_array(self, walls):
+        self.walls[:] = walls.tobytes()
+
+    @property
+    def hits(self):
+        return self.walls.hits + self.visited.hits
+
+    @property
+    def misses(self):
+        return self.walls.misses + self.visited.misses
+
+    def flush(self):
+        self.walls.flush()
+        self.visited.flush()
+
+
+def _remove_store(resident, directory):
+    for view in resident.values():
+        buffer = view.obj
+        view.release()
+        buffer.close()
+    shutil.rmtree(directory, ignore_errors=True)
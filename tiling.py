@@ -0,0 +1,131 @@
+"""
+Parallel generation of one large maze in square tiles.
+
+The grid is cut into tiles of tile_size by tile_size cells. Every tile is
+carved on its own by the backtracker in a worker process, with a
+random.Random of its own derived from the master seed and the tile number.
+The tiles are then stitched into one perfect maze by opening a single wall
+on the border of every tile pair in a random spanning tree of the tiles.
+
+Tile contents depend only on the seed and the tile, and the stitching only on
+the seed, so the maze is byte identical for a given seed and tile size
+however many workers carve it.
+"""
+import os
+import random
+
+from generators import UnionFind, carve_backtracker
+from grid import Grid, BOTTOM, RIGHT, TILE_SIZE
+
+
+def carve_tiled(
+    grid, seed, tile_size=TILE_SIZE, workers=None, check_cancelled=None
+):
+    """
+    Carves a perfect maze into grid from tiles carved by workers processes,
+    all cores by default. One worker, or a single tile, carves in this
+    process. check_cancelled() is called before every tile is placed, so a
+    caller can stop the carve by raising from it. Returns the number of
+    passages opened.
+    """
+    tiles = _tiles(grid.num_rows, grid.num_cols, tile_size)
+    tasks = [
+        (seed, number, rows, cols)
+        for number, (_, _, rows, cols) in enumerate(tiles)
+    ]
+    workers = workers or os.cpu_count() or 1
+
+    if workers > 1 and len(tiles) > 1:
+        # only imported when needed, it costs tens of milliseconds
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(workers)
+        try:
+            chunksize = max(1, len(tasks) // (workers * 4))
+            carved_tiles = executor.map(_carve_tile, tasks, chunksize=chunksize)
+            carved = _place(grid, tiles, carved_tiles, check_cancelled)
+        finally:
+            # a cancelled carve does not wait for the tiles still queued
+            executor.shutdown(cancel_futures=True)
+    else:
+        carved = _place(grid, tiles, map(_carve_tile, tasks), check_cancelled)
+
+    return carved + _stitch(grid, tile_size, random.Random(f"{seed}-stitch"))
+
+
+def _tiles(num_rows, num_cols, tile_size):
+    """
+    (i, j, rows, cols) of every tile in row major order, where (i, j) is its
+    first cell. Tiles on the far edges are cut short.
+    """
+    return [
+        (i, j, min(tile_size, num_rows - i), min(tile_size, num_cols - j))
+        for i in range(0, num_rows, tile_size)
+        for j in range(0, num_cols, tile_size)
+    ]
+
+
+def _carve_tile(task):
+    """
+    Carves one tile as a maze of its own and returns its wall masks and the
+    number of passages opened.
+    """
+    seed, number, rows, cols = task
+    tile = Grid(rows, cols)
+    carved = carve_backtracker(tile, 0, random.Random(f"{seed}-{number}"))
+    return bytes(tile.walls), carved
+
+
+def _place(grid, tiles, carved_tiles, check_cancelled=None):
+    """
+    Copies the carved tiles into grid row by row.
+    """
+    num_cols = grid.num_cols
+    carved = 0
+    for (i, j, rows, cols), (walls, tile_carved) in zip(tiles, carved_tiles):
+        if check_cancelled is not None:
+            check_cancelled()
+        for row in range(rows):
+            start = (i + row) * num_cols + j
+            grid.walls[start : start + cols] = walls[row * cols : (row + 1) * cols]
+        carved += tile_carved
+    return carved
+
+
+def _stitch(grid, tile_size, rng):
+    """
+    Joins the tiles with Kruskal's algorithm over the tile grid, opening one
+    wall at a random spot on the border of every pair it joins.
+    """
+    num_rows, num_cols = grid.num_rows, grid.num_cols
+    tile_rows = -(-num_rows // tile_size)
+    tile_cols = -(-num_cols // tile_size)
+
+    borders = []
+    for tile_i in range(tile_rows):
+        for tile_j in range(tile_cols):
+            tile = tile_i * tile_cols + tile_j
+            if tile_j + 1 < tile_cols:
+                borders.append((tile, tile + 1, BOTTOM))
+            if tile_i + 1 < tile_rows:
+                borders.append((tile, tile + tile_cols, RIGHT))
+    rng.shuffle(borders)
+
+    sets = UnionFind(tile_rows * tile_cols)
+    carved = 0
+    for tile, other, wall in borders:
+        if not sets.union(tile, other):
+            continue
+        tile_i, tile_j = divmod(tile, tile_cols)
+        first_i = tile_i * tile_size
+        first_j = tile_j * tile_size
+        if wall == BOTTOM:
+            # last column of the tile, any of its rows
+            i = rng.randrange(first_i, min(first_i + tile_size, num_rows))
+            j = first_j + tile_size - 1
+        else:
+            i = first_i + tile_size - 1
+            j = rng.randrange(first_j, min(first_j + tile_size, num_cols))
+        grid.carve(i * num_cols + j, wall)
+        carved += 1
+    return carved
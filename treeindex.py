@@ -0,0 +1,165 @@
+"""
+Path queries between any two cells of a perfect maze.
+
+A perfect maze is a spanning tree of its cells, so the path between two cells
+is unique and goes through their lowest common ancestor. TreeIndex roots the
+tree at the entrance once, keeping the depth of every cell and binary lifting
+tables (the 2^k-th ancestor of every cell, one flat array per k). A distance
+is then an O(log n) ancestor lookup, and a path only costs its own length on
+top of that. Recently returned paths are kept in a small LRU cache.
+"""
+from array import array
+from collections import OrderedDict, deque
+
+# paths kept by the LRU cache
+PATH_CACHE_SIZE = 1024
+# cells of a lifting level filled at a time
+LEVEL_CHUNK = 1 << 16
+
+
+class TreeIndex:
+    """
+    Depths and ancestor tables of the tree rooted at cell root. depth[v] is
+    the number of steps from root to cell v, -1 if v cannot be reached, and
+    up[k][v] is the 2^k-th ancestor of v, or root past the top. Cells are
+    flat indices. hits and misses count path queries served by the cache.
+
+    Raises ValueError when the part of the maze reachable from root has a
+    loop, since paths would no longer be unique.
+    """
+    def __init__(
+        self, grid, open_masks, offsets, root=0, cache_size=PATH_CACHE_SIZE
+    ):
+        self.num_cols = grid.num_cols
+        self.root = root
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._paths = OrderedDict()
+
+        depth = grid.allocate("i", -1)
+        parent = grid.allocate("i", root)
+        depth[root] = 0
+        queue = deque([root])
+        reached = 1
+        open_sides = 0
+        max_depth = 0
+        while queue:
+            index = queue.popleft()
+            next_depth = depth[index] + 1
+            for offset in offsets[open_masks[index]]:
+                open_sides += 1
+                next_index = index + offset
+                if depth[next_index] == -1:
+                    depth[next_index] = next_depth
+                    parent[next_index] = index
+                    queue.append(next_index)
+                    reached += 1
+                    max_depth = next_depth
+        # every passage is seen from both of its cells
+        if open_sides != 2 * (reached - 1):
+            raise ValueError("the maze has loops, so paths are not unique")
+
+        self.depth = depth
+        self.up = [parent]
+        for _ in range(1, max(1, max_depth.bit_length())):
+            previous = self.up[-1]
+            level = grid.allocate("i", root)
+            # a chunk at a time, so a level on disk is never held in memory
+            for start in range(0, len(previous), LEVEL_CHUNK):
+                ancestors = previous[start : start + LEVEL_CHUNK]
+                level[start : start + len(ancestors)] = array(
+                    "i", [previous[ancestor] for ancestor in ancestors]
+                )
+            self.up.append(level)
+
+    def ancestor(self, cell, steps):
+        """
+        The cell steps levels above cell, found in one jump per set bit.
+        """
+        bit = 0
+        while steps:
+            if steps & 1:
+                cell = self.up[bit][cell]
+            steps >>= 1
+            bit += 1
+        return cell
+
+    def lowest_common_ancestor(self, a, b):
+        """
+        The deepest cell that is an ancestor of both a and b, -1 if either one
+        cannot be reached from root.
+        """
+        depth = self.depth
+        if depth[a] == -1 or depth[b] == -1:
+            return -1
+        if depth[a] < depth[b]:
+            a, b = b, a
+        a = self.ancestor(a, depth[a] - depth[b])
+        if a == b:
+            return a
+        for level in reversed(self.up):
+            if level[a] != level[b]:
+                a = level[a]
+                b = level[b]
+        return self.up[0][a]
+
+    def distance(self, start, goal):
+        """
+        Steps on the path between cells start and goal, -1 if there is none.
+        """
+        common = self.lowest_common_ancestor(start, goal)
+        if common == -1:
+            return -1
+        depth = self.depth
+        return depth[start] + depth[goal] - 2 * depth[common]
+
+    def path(self, start, goal):
+        """
+        The path from cell start to cell goal as (i, j) cells, empty if there
+        is none. A path cached in either direction is reused.
+        """
+        key = (start, goal)
+        cells = self._paths.get(key)
+        if cells is not None:
+            self.hits += 1
+            self._paths.move_to_end(key)
+            return list(cells)
+
+        reverse = self._paths.get((goal, start))
+        if reverse is not None:
+            self.hits += 1
+            cells = reverse[::-1]
+        else:
+            self.misses += 1
+            cells = tuple(self._walk(start, goal))
+        self._paths[key] = cells
+        if len(self._paths) > self.cache_size:
+            self._paths.popitem(last=False)
+        return list(cells)
+
+    def _walk(self, start, goal):
+        """
+        Climbs from both ends to their lowest common ancestor.
+        """
+        common = self.lowest_common_ancestor(start, goal)
+        if common == -1:
+            return []
+        parent = self.up[0]
+        num_cols = self.num_cols
+        path = []
+        index = start
+        while index != common:
+            path.append(divmod(index, num_cols))
+            index = parent[index]
+        path.append(divmod(common, num_cols))
+        tail = []
+        index = goal
+        while index != common:
+            tail.append(divmod(index, num_cols))
+            index = parent[index]
+        tail.reverse()
+        return path + tail
+
+    def clear_cache(self):
+        self._paths.clear()
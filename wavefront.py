@@ -0,0 +1,201 @@
+from array import array
+
+import numpy as np
+
+from generators import CANCEL_CHECK
+from grid import TOP, RIGHT, BOTTOM, LEFT, OPPOSITE, NEIGHBOUR_ORDER
+
+# number of open sides of every mask
+DEGREE = np.array([bin(mask).count("1") for mask in range(16)], dtype=np.uint8)
+
+# dead ends filled per array pass below which the rest is filled in Python
+FILL_BATCH = 256
+# frontier size below which a distance field level is stepped in Python
+SWEEP_BATCH = 128
+
+
+def open_directions(grid):
+    """
+    Per cell bitmask of the walls that are open on both sides, built from
+    shifted comparisons of the wall array. Sides on the edge of the grid are
+    never open, even at the entrance and exit.
+    """
+    walls = grid.wall_array()
+    open_mask = np.zeros(walls.shape, dtype=np.uint8)
+
+    # passage between (i, j) and (i, j + 1)
+    vertical = ((walls[:, :-1] & BOTTOM) == 0) & ((walls[:, 1:] & TOP) == 0)
+    open_mask[:, :-1] |= vertical * np.uint8(BOTTOM)
+    open_mask[:, 1:] |= vertical * np.uint8(TOP)
+
+    # passage between (i, j) and (i + 1, j)
+    horizontal = ((walls[:-1, :] & RIGHT) == 0) & ((walls[1:, :] & LEFT) == 0)
+    open_mask[:-1, :] |= horizontal * np.uint8(RIGHT)
+    open_mask[1:, :] |= horizontal * np.uint8(LEFT)
+
+    return open_mask.ravel()
+
+
+def distance_field(grid, start=(0, 0)):
+    """
+    Breadth first flood fill of the whole maze from start.
+
+    Every sweep advances the whole frontier one step. Large frontiers are
+    swept with array operations, while the narrow frontiers of long
+    corridors, where a pass per level would cost more than it saves, are
+    stepped in Python. Both keep the frontier in queue order and try
+    neighbours in NEIGHBOUR_ORDER, so every cell gets the same parent as in
+    Maze._solve_bfs. Returns an int32 (num_rows, num_cols) array of step
+    counts, -1 for cells that cannot be reached, and the path from start to
+    the exit as (i, j) cells, empty if the exit cannot be reached.
+    """
+    num_cols = grid.num_cols
+    open_list = bytearray(open_directions(grid).tobytes())
+    open_mask = np.frombuffer(open_list, dtype=np.uint8)
+    offsets = [(wall, grid.offset(wall)) for wall in NEIGHBOUR_ORDER]
+    neighbour_offsets = grid.neighbour_offsets()
+    walls = np.array([wall for wall, _ in offsets], dtype=np.uint8)
+    steps = np.array([offset for _, offset in offsets], dtype=np.intp)
+
+    # Python arrays with NumPy views, so both kinds of sweep share them
+    distance_list = array("i", [-1]) * len(grid)
+    parent_list = array("i", [-1]) * len(grid)
+    distances = np.frombuffer(distance_list, dtype=np.int32)
+    parents = np.frombuffer(parent_list, dtype=np.int32)
+    source = start[0] * num_cols + start[1]
+    distance_list[source] = 0
+    frontier = [source]
+    step = 0
+
+    while len(frontier):
+        step += 1
+        if len(frontier) >= SWEEP_BATCH:
+            frontier = np.asarray(frontier, dtype=np.intp)
+            # candidates in queue order, then neighbour order
+            candidates = (frontier[:, None] + steps).ravel()
+            open_sides = (open_mask[frontier][:, None] & walls) != 0
+            found = np.flatnonzero(open_sides.ravel())
+            found = found[distances[candidates[found]] == -1]
+            # a cell reached twice keeps the parent that came first
+            _, first = np.unique(candidates[found], return_index=True)
+            found = found[np.sort(first)]
+            reached = candidates[found]
+            distances[reached] = step
+            parents[reached] = frontier[found // len(offsets)]
+            frontier = reached
+            continue
+
+        reached = []
+        for index in list(frontier):
+            for offset in neighbour_offsets[open_list[index]]:
+                next_index = index + offset
+                if distance_list[next_index] == -1:
+                    distance_list[next_index] = step
+                    parent_list[next_index] = index
+                    reached.append(next_index)
+        frontier = reached
+
+    goal = len(grid) - 1
+    path = []
+    if distance_list[goal] != -1:
+        index = goal
+        while index != source:
+            path.append(divmod(index, num_cols))
+            index = parent_list[index]
+        path.append(divmod(source, num_cols))
+        path.reverse()
+    return distances.reshape(grid.num_rows, num_cols), path
+
+
+def dead_end_fill(grid, start=(0, 0), goal=None, check_cancelled=None):
+    """
+    Dead end filling: every cell other than start and goal with a single open
+    side is filled, closing the side its neighbour had open towards it, until
+    no dead ends are left. In a perfect maze only the path remains, which is
+    then read off from start to goal.
+
+    Only the neighbours of the cells just filled can turn into dead ends, so
+    each pass works on those with array operations and every cell is filled
+    at most once. Mazes with loops keep them, and an empty path is returned if
+    the remaining corridor does not lead from start to goal on its own.
+    check_cancelled() is called every pass and every CANCEL_CHECK cells
+    filled in Python. Returns the path of (i, j) cells, the number of cells
+    filled and the largest number filled in one pass.
+    """
+    num_cols = grid.num_cols
+    open_mask = open_directions(grid)
+    source = start[0] * num_cols + start[1]
+    target = len(grid) - 1 if goal is None else goal[0] * num_cols + goal[1]
+
+    # the neighbour offset and its facing wall, for every single wall mask
+    offset_of = np.zeros(16, dtype=np.intp)
+    facing = np.zeros(16, dtype=np.uint8)
+    for wall, offset in ((BOTTOM, 1), (TOP, -1), (LEFT, -num_cols), (RIGHT, num_cols)):
+        offset_of[wall] = offset
+        facing[wall] = OPPOSITE[wall]
+
+    keep = np.zeros(len(grid), dtype=bool)
+    keep[[source, target]] = True
+    dead = np.flatnonzero((DEGREE[open_mask] == 1) & ~keep)
+    filled = peak = 0
+
+    while dead.size >= FILL_BATCH:
+        if check_cancelled is not None:
+            check_cancelled()
+        filled += dead.size
+        peak = max(peak, dead.size)
+        masks = open_mask[dead]
+        neighbours = dead + offset_of[masks]
+        open_mask[dead] = 0
+        np.bitwise_and.at(open_mask, neighbours, ~facing[masks])
+        ends = (DEGREE[open_mask[neighbours]] == 1) & ~keep[neighbours]
+        dead = np.unique(neighbours[ends])
+
+    # a few long corridors left cost a pass per cell, so those are
+    # finished one cell at a time instead
+    open_mask = bytearray(open_mask.tobytes())
+    peak = max(peak, dead.size)
+    stack = dead.tolist()
+    offset_of = offset_of.tolist()
+    facing = facing.tolist()
+    degree = DEGREE.tolist()
+    while stack:
+        index = stack.pop()
+        mask = open_mask[index]
+        if not mask:
+            continue
+        filled += 1
+        if check_cancelled is not None and not filled % CANCEL_CHECK:
+            check_cancelled()
+        neighbour = index + offset_of[mask]
+        open_mask[index] = 0
+        open_mask[neighbour] &= ~facing[mask]
+        if degree[open_mask[neighbour]] != 1:
+            continue
+        if neighbour != source and neighbour != target:
+            stack.append(neighbour)
+
+    return _follow(open_mask, num_cols, source, target), filled, peak
+
+
+def _follow(open_mask, num_cols, source, target):
+    """
+    Walks the open sides left after filling from source to target.
+    """
+    offsets = ((BOTTOM, 1), (TOP, -1), (LEFT, -num_cols), (RIGHT, num_cols))
+    path = [source]
+    previous = -1
+    index = source
+    while index != target:
+        for wall, offset in offsets:
+            if open_mask[index] & wall and index + offset != previous:
+                previous = index
+                index += offset
+                break
+        else:
+            return []
+        # a loop brought the walk back onto itself
+        if len(path) > len(open_mask):
+            return []
+        path.append(index)
+    return [divmod(index, num_cols) for index in path]
@@ -1,7 +1,9 @@
 from tkinter import (
     Tk,
     BOTH,
+    NW,
     Canvas,
+    PhotoImage,
     Menu,
     Toplevel,
     Label,
@@ -12,11 +14,18 @@ from tkinter import (
     IntVar,
 )
 import re
+from importlib.util import find_spec
+from queue import Empty
+from time import perf_counter
+from grid import TOP, RIGHT, BOTTOM, LEFT
 from maze import (
     Maze,
     ChangeAnimationSpeed,
+    ChangeRenderMode,
+    GenerateMethod,
+    MazeWorker,
     SolveMethod,
-    Run,
+    RunInBackground,
 )
 
 DISPLAY_RESOLUTIONS = {
@@ -31,6 +40,54 @@ DISPLAY_RESOLUTIONS = {
     "800x600": (800, 600),
 }
 
+GENERATORS = {
+    "Backtracker": GenerateMethod.BACKTRACKER.value,
+    "Eller's": GenerateMethod.ELLER.value,
+    "Kruskal's": GenerateMethod.KRUSKAL.value,
+    "Wilson's": GenerateMethod.WILSON.value,
+    "Binary Tree": GenerateMethod.BINARY_TREE.value,
+    "Sidewinder": GenerateMethod.SIDEWINDER.value,
+    "Tiled (Parallel)": GenerateMethod.TILED.value,
+}
+
+RENDER_MODES = {
+    "Vector": False,
+    "Raster": True,
+}
+
+# NumPy is optional, menu options that need it are left out without it
+HAS_NUMPY = find_spec("numpy") is not None
+NUMPY_GENERATORS = ["Binary Tree", "Sidewinder"]
+NUMPY_RENDER_MODES = ["Raster"]
+
+ANIMATION_SPEEDS = {
+    "Very Slow": 1,
+    "Slow": 4,
+    "Normal": 16,
+    "Fast": 128,
+    # as many events as fit in a frame
+    "Very Fast": 0,
+}
+
+# largest row or column count per render mode, vector mode keeps canvas items
+# for every wall so only the raster mode takes mazes past three digits
+MAX_MAZE_SIZE = {
+    False: 999,
+    True: 99999,
+}
+
+ANIMATION_FPS = 60
+# polling interval in milliseconds while there is nothing to draw
+IDLE_INTERVAL = 100
+# polling interval in milliseconds while a cancelled run winds down
+CANCEL_POLL_INTERVAL = 20
+
+# pixel colors for moves blitted into the raster image
+RASTER_COLORS = {
+    "green": "#00a000",
+    "red": "#ff0000",
+}
+
 
 class App(Tk):
     def __init__(
@@ -51,7 +108,6 @@ class App(Tk):
         self.protocol("WM_DELETE_WINDOW", self.close)
         self.option_add("*tearoff", False)
         self.minsize(600, 600)
-        self.running = False
 
         # create widgets
         self.canvas = CustomCanvas(self, width, height)
@@ -67,29 +123,118 @@ class App(Tk):
             self,
             None,
         )
-        self.maze.inital_run()
+        self.maze.set_canvas_size(width, height)
+        self.scheduler = AnimationScheduler(self, self.canvas, self.maze)
+        self.worker = MazeWorker(self.maze)
+        self._pending_run = None
+
+        # start the first maze once the event loop is running
+        self.after_idle(self.worker.start, self.maze.inital_run)
 
         # main loop
-        self.wait_for_close()
+        self.mainloop()
 
     def close(self):
         print("closing")
-        self.running = False
+        # the worker thread is a daemon, so the window does not wait for it
+        self.worker.cancel()
+        if self._pending_run is not None:
+            self.after_cancel(self._pending_run)
+        self.scheduler.stop()
+        self.destroy()
+
+    def start_run(self, *args):
+        """
+        Cancels the current run and starts a new one with the RunInBackground
+        arguments once the worker has stopped. The worker is polled from
+        after() callbacks, so the window never blocks waiting for it.
+        """
+        self.worker.cancel()
+        if self._pending_run is not None:
+            self.after_cancel(self._pending_run)
+        self._start_when_idle(args)
+
+    def _start_when_idle(self, args):
+        if self.worker.busy():
+            self._pending_run = self.after(
+                CANCEL_POLL_INTERVAL, self._start_when_idle, args
+            )
+            return
+        self._pending_run = None
+        self.scheduler.discard()
+        self.canvas.clear_screen()
+        self.maze.set_canvas_size(self.canvas.winfo_width(), self.canvas.winfo_height())
+        RunInBackground(self.worker).execute(*args)
+
+
+class AnimationScheduler:
+    """
+    Plays the draw events queued by the maze back on the canvas from Tk
+    after() callbacks, at a fixed frame rate and the maze's animation draw
+    speed in events per frame.
+    """
+    def __init__(self, root, canvas, maze, fps=ANIMATION_FPS):
+        self.root = root
+        self.canvas = canvas
+        self.maze = maze
+        self.frame_time = 1 / fps
+        self.interval = max(1, round(1000 / fps))
+        self._after_id = self.root.after(self.interval, self.frame)
+
+    def frame(self):
+        events = self.maze.draw_events
+        events_per_frame = self.maze.get_animation_draw_speed()
+        deadline = perf_counter() + self.frame_time / 2
+        played = 0
+        try:
+            while True:
+                if events_per_frame and played >= events_per_frame:
+                    break
+                if not events_per_frame and perf_counter() >= deadline:
+                    break
+                try:
+                    name, args = events.get_nowait()
+                except Empty:
+                    break
+                played += 1
+                getattr(self.canvas, name)(*args)
+        finally:
+            # a failing canvas call still leaves the next frame scheduled, so
+            # the queue keeps draining
+            self._after_id = self.root.after(
+                self.interval if played else IDLE_INTERVAL, self.frame
+            )
 
-    def redraw(self):
-        self.update_idletasks()
-        self.update()
+    def stop(self):
+        """
+        Cancels the next frame so no callback outlives the window.
+        """
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
 
-    def wait_for_close(self):
-        self.running = True
-        while self.running:
-            self.redraw()
+    def discard(self):
+        """
+        Drops every draw event that has not been played yet.
+        """
+        events = self.maze.draw_events
+        while True:
+            try:
+                events.get_nowait()
+            except Empty:
+                return
 
 
 class CustomCanvas(Canvas):
     def __init__(self, root, width, height):
         super().__init__(root, bg="white", width=width, height=height)
         self.root = root
+        # canvas item ids of walls and moves, so each one is only created once
+        self._wall_items = {}
+        self._move_items = {}
+        # image and pixel layout of the raster render mode
+        self._raster_image = None
+        self._raster_layout = None
         self.pack(fill=BOTH, expand=1)
 
         # create menubar widget
@@ -97,14 +242,126 @@ class CustomCanvas(Canvas):
 
     def clear_screen(self):
         self.delete("all")
+        self._wall_items = {}
+        self._move_items = {}
+        self._raster_image = None
+        self._raster_layout = None
 
     def resize_canvas(self, resolution):
         if not self.root.maze.draw_state:
             self.config(width=resolution[0], height=resolution[1])
             self.clear_screen()
 
-    def draw_line(self, line, fill_color="black"):
-        line.draw(self, fill_color)
+    def draw_wall(self, key, coords, present):
+        """
+        Creates the line item of a wall the first time it is present and
+        deletes it once the wall is broken down.
+        """
+        item = self._wall_items.get(key)
+        if present and item is None:
+            self._wall_items[key] = self.create_line(*coords, fill="black", width=2)
+        elif not present and item is not None:
+            self.delete(item)
+            del self._wall_items[key]
+
+    def draw_move(self, key, coords, fill_color):
+        """
+        Draws a move between two cells, recoloring it if it was drawn before.
+        """
+        item = self._move_items.get(key)
+        if item is None:
+            self._move_items[key] = self.create_line(
+                *coords, fill=fill_color, width=2
+            )
+        else:
+            self.itemconfigure(item, fill=fill_color)
+
+    def draw_path(self, points, fill_color="red"):
+        """
+        Draws a whole path as a single multi point line item.
+        """
+        if len(points) < 2:
+            return
+        coords = [value for point in points for value in point]
+        self.create_line(*coords, fill=fill_color, width=2)
+
+    def draw_maze(self, walls, num_rows, num_cols, x1, y1, size_x, size_y):
+        """
+        Draws a finished maze from its wall masks, merging every straight run
+        of walls into one line item. The walls can not be updated one by one
+        afterwards, use draw_wall for mazes that are still being carved.
+        """
+        # horizontal lines, level k lies between cell j = k - 1 and j = k
+        for k in range(num_cols + 1):
+            y = y1 + size_y * k
+            if k == 0:
+                wall, offset = TOP, 0
+            else:
+                wall, offset = BOTTOM, k - 1
+            present = [
+                walls[i * num_cols + offset] & wall for i in range(num_rows)
+            ]
+            for start, end in _runs(present):
+                self.create_line(
+                    x1 + size_x * start, y, x1 + size_x * end, y, width=2
+                )
+
+        # vertical lines, level k lies between cell i = k - 1 and i = k
+        for k in range(num_rows + 1):
+            x = x1 + size_x * k
+            if k == 0:
+                wall, row = LEFT, 0
+            else:
+                wall, row = RIGHT, k - 1
+            present = [
+                walls[row * num_cols + j] & wall for j in range(num_cols)
+            ]
+            for start, end in _runs(present):
+                self.create_line(
+                    x, y1 + size_y * start, x, y1 + size_y * end, width=2
+                )
+
+    def draw_raster(self, walls, x, y, width, height):
+        """
+        Paints the whole maze from its wall mask array into one PhotoImage,
+        so drawing costs the same for any number of cells. Needs NumPy.
+        """
+        from raster import RasterLayout, to_ppm
+
+        width = max(width, 1)
+        height = max(height, 1)
+        num_rows, num_cols = walls.shape
+        self._raster_layout = RasterLayout(num_rows, num_cols, width, height)
+        self._raster_image = PhotoImage(
+            master=self, data=to_ppm(self._raster_layout.render(walls)), format="PPM"
+        )
+        self.create_image(x, y, image=self._raster_image, anchor=NW)
+
+    def blit_move(self, current, next, fill_color):
+        """
+        Fills the pixels of a move between two cells in the raster image.
+        """
+        if self._raster_image is None:
+            return
+        self._raster_image.put(
+            RASTER_COLORS[fill_color],
+            to=self._raster_layout.cells_rectangle(current, next),
+        )
+
+
+def _runs(present):
+    """
+    Start and end positions of every run of consecutive true values.
+    """
+    start = None
+    for position, value in enumerate(present):
+        if value and start is None:
+            start = position
+        elif not value and start is not None:
+            yield start, position
+            start = None
+    if start is not None:
+        yield start, len(present)
 
 
 class MenuBar(Menu):
@@ -134,7 +391,7 @@ class MenuOption(Menu):
         # make a window
         if self.config_window is None:
             self.config_window = MazeConfig(
-                self.root_win, "Maze Configuration", "300x400"
+                self.root_win, "Maze Configuration", "300x670"
             )
             self.config_window.protocol("WM_DELETE_WINDOW", self.close_window)
 
@@ -153,6 +410,10 @@ class MazeConfig(Toplevel):
         self.display_resolution_frame = DisplayResolutionFrame(self, self.root)
         # create animation speed frame
         self.animation_speed_frame = AnimationSpeedFrame(self, self.root)
+        # create render mode frame
+        self.render_mode_frame = RenderModeFrame(self, self.root)
+        # create generator frame
+        self.generator_frame = GeneratorFrame(self)
         # create algorithm frame
         self.algorithm_frame = AlgorithmFrame(self, self.root)
         # position the widgets within the window and display them
@@ -162,12 +423,15 @@ class MazeConfig(Toplevel):
         self.row_col_frame.pack(pady=20)
         self.display_resolution_frame.pack(pady=20)
         self.animation_speed_frame.pack(pady=20)
+        self.render_mode_frame.pack(pady=20)
+        self.generator_frame.pack(pady=20)
         self.algorithm_frame.pack(pady=20)
 
 
 class RowColFrame(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent)
+        self.parent = parent
         self.row_label = Label(self, text="Row:")
         self.column_label = Label(self, text="Column:")
         self.row_label_field = Entry(
@@ -192,8 +456,13 @@ class RowColFrame(ttk.Frame):
         self.column_label.grid(row=1, column=0)
         self.column_label_field.grid(row=1, column=1)
 
+    def max_size(self):
+        return MAX_MAZE_SIZE[self.parent.root.maze.raster]
+
     def validate_int_val(self, value):
-        if (re.match("^[0-9]*$", value)) and (len(value) < 4):
+        if (re.match("^[0-9]*$", value)) and (
+            value == "" or int(value) <= self.max_size()
+        ):
             return True
         return False
 
@@ -203,7 +472,8 @@ class RowColFrame(ttk.Frame):
         except:
             print("something went wrong in converting row value into int")
             value = 12
-        return value
+        # the render mode may have changed since the value was typed
+        return min(value, self.max_size())
 
     def get_col_value(self):
         try:
@@ -211,7 +481,7 @@ class RowColFrame(ttk.Frame):
         except:
             print("something went wrong in converting col value into int")
             value = 12
-        return value
+        return min(value, self.max_size())
 
 
 class DisplayResolutionFrame(ttk.Frame):
@@ -248,7 +518,7 @@ class AnimationSpeedFrame(ttk.Frame):
         self.animation_speed_label = Label(self, text="Cell Draw Speed:")
         self.speed_combo = ttk.Combobox(
             self,
-            values=["Very Slow", "Slow", "Normal", "Fast", "Very Fast"],
+            values=list(ANIMATION_SPEEDS.keys()),
             width=10,
             state="readonly",
         )
@@ -260,23 +530,61 @@ class AnimationSpeedFrame(ttk.Frame):
         self.animation_speed_label.grid(row=0, column=0)
         self.speed_combo.grid(row=0, column=1)
 
-    ## TODO
     def changeAnimationSpeed(self, _):
-        # speed placeholder for now
-        speed = 0.05
-        match self.speed_combo.get():
-            case "Very Slow":
-                speed = 0.3
-            case "Slow":
-                speed = 0.1
-            case "Normal":
-                speed = 0.05
-            case "Fast":
-                speed = 0.005
-            case "Very Fast":
-                speed = 0.0001
         cmd = ChangeAnimationSpeed(self.root.maze)
-        cmd.execute(speed=speed)
+        cmd.execute(speed=ANIMATION_SPEEDS[self.speed_combo.get()])
+
+
+def available(options, needs_numpy):
+    """
+    Names of the options, without those in needs_numpy when NumPy is missing.
+    """
+    return [name for name in options if HAS_NUMPY or name not in needs_numpy]
+
+
+class RenderModeFrame(ttk.Frame):
+    def __init__(self, parent, root):
+        super().__init__(parent)
+        self.root = root
+        self.render_mode_label = Label(self, text="Render Mode:")
+        self.render_mode_combo = ttk.Combobox(
+            self,
+            values=available(RENDER_MODES, NUMPY_RENDER_MODES),
+            width=10,
+            state="readonly",
+        )
+        self.render_mode_combo.bind("<<ComboboxSelected>>", self.changeRenderMode)
+        self.position()
+        self.render_mode_combo.current(1 if root.maze.raster else 0)
+
+    def position(self):
+        self.render_mode_label.grid(row=0, column=0)
+        self.render_mode_combo.grid(row=0, column=1)
+
+    def changeRenderMode(self, _):
+        cmd = ChangeRenderMode(self.root.maze)
+        cmd.execute(raster=RENDER_MODES[self.render_mode_combo.get()])
+
+
+class GeneratorFrame(ttk.Frame):
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.generator_label = Label(self, text="Generator:")
+        self.generator_combo = ttk.Combobox(
+            self,
+            values=available(GENERATORS, NUMPY_GENERATORS),
+            width=10,
+            state="readonly",
+        )
+        self.position()
+        self.generator_combo.current(0)
+
+    def position(self):
+        self.generator_label.grid(row=0, column=0)
+        self.generator_combo.grid(row=0, column=1)
+
+    def get_generate_method(self):
+        return GENERATORS[self.generator_combo.get()]
 
 
 class AlgorithmFrame(ttk.Frame):
@@ -293,6 +601,18 @@ class AlgorithmFrame(ttk.Frame):
             variable=res,
             value=SolveMethod.ASTAR.value,
         )
+        self.WEIGHTED_ASTAR_radio = Radiobutton(
+            self,
+            text="Weighted A* Pathing",
+            variable=res,
+            value=SolveMethod.WEIGHTED_ASTAR.value,
+        )
+        self.GREEDY_radio = Radiobutton(
+            self,
+            text="Greedy Best First Pathing",
+            variable=res,
+            value=SolveMethod.GREEDY.value,
+        )
         self.DFS_radio = Radiobutton(
             self,
             text="Depth First Pathing",
@@ -305,6 +625,25 @@ class AlgorithmFrame(ttk.Frame):
             variable=res,
             value=SolveMethod.BFS.value,
         )
+        self.BIBFS_radio = Radiobutton(
+            self,
+            text="Bidirectional Breadth First Pathing",
+            variable=res,
+            value=SolveMethod.BIBFS.value,
+        )
+        self.JUNCTION_radio = Radiobutton(
+            self,
+            text="Junction Graph A* Pathing",
+            variable=res,
+            value=SolveMethod.JUNCTION.value,
+        )
+        self.DEADEND_FILL_radio = Radiobutton(
+            self,
+            text="Dead End Filling (NumPy)",
+            variable=res,
+            value=SolveMethod.DEADEND_FILL.value,
+            state="normal" if HAS_NUMPY else "disabled",
+        )
         # change placeholder arugments back after refactoring
         self.run_button = Button(
             self,
@@ -313,24 +652,44 @@ class AlgorithmFrame(ttk.Frame):
                 res.get(),
                 self.parent.row_col_frame.get_row_value(),
                 self.parent.row_col_frame.get_col_value(),
+                self.parent.generator_frame.get_generate_method(),
             ),
         )
         self.position()
 
     def position(self):
         self.ASTAR_radio.grid()
+        self.WEIGHTED_ASTAR_radio.grid()
+        self.GREEDY_radio.grid()
         self.BFS_radio.grid()
+        self.BIBFS_radio.grid()
+        self.JUNCTION_radio.grid()
+        self.DEADEND_FILL_radio.grid()
         self.DFS_radio.grid()
         self.run_button.grid()
 
-    def runMazeSolver(self, solve_method, row_value=None, column_value=None):
-        self.root.canvas.clear_screen()
+    def runMazeSolver(
+        self,
+        solve_method,
+        row_value=None,
+        column_value=None,
+        generate_method=GenerateMethod.BACKTRACKER.value,
+    ):
         match solve_method:
             case SolveMethod.DFS.value:
                 self.root.title("Depth First Search")
             case SolveMethod.BFS.value:
                 self.root.title("Breadth First Search")
+            case SolveMethod.BIBFS.value:
+                self.root.title("Bidirectional Breadth First Search")
             case SolveMethod.ASTAR.value:
                 self.root.title("A* Pathing")
-        cmd = Run(self.root.maze)
-        cmd.execute(solve_method, row_value=row_value, col_value=column_value)
+            case SolveMethod.WEIGHTED_ASTAR.value:
+                self.root.title("Weighted A* Pathing")
+            case SolveMethod.GREEDY.value:
+                self.root.title("Greedy Best First Pathing")
+            case SolveMethod.JUNCTION.value:
+                self.root.title("Junction Graph A* Pathing")
+            case SolveMethod.DEADEND_FILL.value:
+                self.root.title("Dead End Filling")
+        self.root.start_run(solve_method, row_value, column_value, generate_method)